@@ -0,0 +1,131 @@
+"""Concurrent request throughput of sync and async database modes
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/async_throughput.py --requests 2000 --concurrency 100
+
+Each mode runs in its own process (settings are read at import) against
+the same database and drives the app in-process through httpx ASGI
+transport. Reads only, so SQLite write locking does not skew the result.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / 'src'
+
+
+def prepare(database_url: str, operations: int):
+    """Create schema, one user and its operations"""
+    sys.path.insert(0, str(SRC))
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('JWT_SECRET', 'benchmark')
+    # pylint: disable=import-outside-toplevel
+    from datetime import date, timedelta
+    from sqlalchemy import create_engine, insert
+    from app.tables import Base, Operation, User
+    from app.services.hashing import hash_password
+
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(User).values(
+            id=1,
+            email='bench@bench',
+            username='bench',
+            password_hash=hash_password('bench', 4),
+        ))
+        connection.execute(insert(Operation), [
+            {
+                'user_id': 1,
+                'date': date(2020, 1, 1) + timedelta(days=i % 1000),
+                'kind': 'income' if i % 3 else 'outcome',
+                'amount': i % 1000,
+            }
+            for i in range(operations)
+        ])
+
+
+async def drive(requests: int, concurrency: int, operations: int) -> dict:
+    """Fire requests at the app and measure"""
+    # pylint: disable=import-outside-toplevel
+    import httpx
+    from app.app import app
+    from app.services.auth import AuthService
+    from app.models.auth import User
+
+    token = AuthService.create_token(User(id=1, email='bench@bench', username='bench'))
+    headers = {'Authorization': f'Bearer {token.access_token}'}
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        async def one(index: int):
+            url = '/operations/?limit=50' if index % 2 else f'/operations/{random.randint(1, operations)}'
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests_per_second': round(requests / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def child(args):
+    """Run one mode, print result as json"""
+    sys.path.insert(0, str(SRC))
+    print(json.dumps(asyncio.run(drive(args.requests, args.concurrency, args.operations))))
+
+
+def main():
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default='sqlite:////tmp/async_throughput.db')
+    parser.add_argument('--operations', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    prepare(args.database_url, args.operations)
+    for mode in ('0', '1'):
+        env = {
+            **os.environ,
+            'DATABASE_URL': args.database_url,
+            'ASYNC_DATABASE': mode,
+            'JWT_SECRET': os.environ.get('JWT_SECRET', 'benchmark'),
+        }
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', *sys.argv[1:]],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{'async' if mode == '1' else 'sync '}: {result}")
+
+
+if __name__ == '__main__':
+    main()
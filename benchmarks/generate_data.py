@@ -0,0 +1,129 @@
+"""Synthetic users and operations for benchmarks
+
+    python benchmarks/generate_data.py --users 100 --operations 10000
+
+Users are named user1..userN, all with password "bench". Every user gets
+a monthly salary and a few other incomes, the rest are small outcomes with
+a long tail, spread over the years before LAST_DATE with more recent activity. The
+same seed gives the same rows. Daily totals are rebuilt at the end.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('JWT_SECRET', 'benchmark')
+
+# pylint: disable=wrong-import-position
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.settings import settings
+from app.services.hashing import hash_password
+from app.services.rollup import rebuild_rollup
+from app.tables import Base, Operation, User
+
+
+PASSWORD = 'bench'
+LAST_DATE = date(2024, 12, 31)
+DESCRIPTIONS = (
+    None, None, None, 'groceries', 'rent', 'transport', 'coffee', 'restaurant',
+    'utilities', 'pharmacy', 'books', 'gift', 'subscription', 'taxi',
+)
+
+
+def user_operations(rng: random.Random, user_id: int, count: int, last: date, days: int):
+    """Operations of one user"""
+    months = max(1, days // 30)
+    salaries = min(count, months)
+    for month in range(salaries):
+        yield {
+            'user_id': user_id,
+            'date': last - timedelta(days=30 * month + rng.randint(0, 2)),
+            'kind': 'income',
+            'amount': Decimal(rng.randint(150000, 600000)) / 100,
+            'description': 'salary',
+        }
+
+    for _ in range(count - salaries):
+        # triangular with mode at the last day: more recent activity
+        day = last - timedelta(days=int(rng.triangular(0, days, 0)))
+        if rng.random() < 0.05:
+            kind, amount = 'income', rng.lognormvariate(4.5, 1)
+        else:
+            kind, amount = 'outcome', rng.lognormvariate(3, 1.2)
+        yield {
+            'user_id': user_id,
+            'date': day,
+            'kind': kind,
+            'amount': Decimal(max(1, int(amount * 100))) / 100,
+            'description': rng.choice(DESCRIPTIONS),
+        }
+
+
+def generate(
+    database_url: str,
+    users: int,
+    operations: int,
+    days: int = 3 * 365,
+    seed: int = 0,
+    batch: int = 20000,
+):
+    """Recreate schema and fill it, operations is per user"""
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    password_hash = hash_password(PASSWORD, settings.bcrypt_rounds)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {
+                'email': f'user{user_id}@bench',
+                'username': f'user{user_id}',
+                'password_hash': password_hash,
+            }
+            for user_id in range(1, users + 1)
+        ])
+
+    rng = random.Random(seed)
+    rows = []
+    with engine.begin() as connection:
+        for user_id in range(1, users + 1):
+            rows.extend(user_operations(rng, user_id, operations, LAST_DATE, days))
+            if len(rows) >= batch:
+                connection.execute(insert(Operation), rows)
+                rows = []
+        if rows:
+            connection.execute(insert(Operation), rows)
+
+    with Session(engine) as session:
+        rebuild_rollup(session)
+    engine.dispose()
+
+
+def main():
+    """Generator entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default='sqlite:////tmp/benchmark.db')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--operations', type=int, default=1000, help='per user')
+    parser.add_argument('--days', type=int, default=3 * 365)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generate(args.database_url, args.users, args.operations, args.days, args.seed)
+    print(
+        f'{args.users} users, {args.users * args.operations} operations '
+        f'in {time.perf_counter() - started:.1f} s'
+    )
+
+
+if __name__ == '__main__':
+    main()
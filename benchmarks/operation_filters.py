@@ -0,0 +1,200 @@
+"""Query plans and timings of operation list filters before and after their indexes
+
+    python benchmarks/operation_filters.py --database-url sqlite:////tmp/filters.db
+
+Fills operations with synthetic rows, a few of them with rare invoice
+descriptions, then runs first pages of date range, amount range, amount
+sort and description searches of one user without
+ix_operations_user_id_amount_id and the description index, and again with
+them. Without the description index every search walks the sort index.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('JWT_SECRET', 'benchmark')
+
+# pylint: disable=wrong-import-position
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.models.operations import OperationFilter
+from app.services.operations import OperationService, filter_conditions, sort_keys
+from app.tables import (
+    Base,
+    Operation,
+    POSTGRESQL_DESCRIPTION_INDEX,
+    SQLITE_DESCRIPTION_INDEX,
+    User,
+)
+
+DESCRIPTIONS = (
+    None, 'groceries', 'rent', 'transport', 'coffee', 'restaurant',
+    'utilities', 'pharmacy', 'books', 'gift', 'subscription', 'taxi',
+)
+CASES = {
+    'date range, one month': OperationFilter(date_from='2020-03-01', date_to='2020-03-31'),
+    'amount range': OperationFilter(amount_min='1000', amount_max='1010'),
+    'amount sort': OperationFilter(sort='amount_desc'),
+    'contains, common': OperationFilter(description_contains='ocer'),
+    'contains, rare': OperationFilter(description_contains='invoice 47'),
+    'prefix, rare': OperationFilter(description_prefix='invoice 9'),
+}
+
+
+def fill(engine, users: int, rows: int, batch: int = 50000):
+    """Create schema without the filter indexes and insert rows"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    drop_filter_indexes(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User),
+            [{'email': f'{i}@bench', 'username': f'user{i}'} for i in range(1, users + 1)],
+        )
+
+    start = date(2015, 1, 1)
+    random.seed(0)
+    with engine.begin() as connection:
+        for offset in range(0, rows, batch):
+            connection.execute(
+                insert(Operation),
+                [
+                    {
+                        'user_id': random.randint(1, users),
+                        'date': start + timedelta(days=random.randint(0, 365 * 8)),
+                        'kind': random.choice(('income', 'outcome', 'outcome')),
+                        'amount': Decimal(random.randint(100, 500000)) / 100,
+                        'description': (
+                            f'invoice {random.randint(1, 999)}'
+                            if random.random() < 0.001 else
+                            random.choice(DESCRIPTIONS)
+                        ),
+                    }
+                    for _ in range(min(batch, rows - offset))
+                ],
+            )
+
+
+def drop_filter_indexes(engine):
+    """Drop the amount index and the description index"""
+    with engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_operations_user_id_amount_id'))
+        if engine.dialect.name == 'sqlite':
+            for trigger in ('insert', 'delete', 'update'):
+                connection.execute(text(f'DROP TRIGGER operations_fts_{trigger}'))
+            connection.execute(text('DROP TABLE operations_fts'))
+        elif engine.dialect.name == 'postgresql':
+            connection.execute(text('DROP INDEX ix_operations_user_id_description_trgm'))
+
+
+def create_filter_indexes(engine):
+    """Create the indexes dropped by drop_filter_indexes"""
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE INDEX ix_operations_user_id_amount_id ON operations (user_id, amount, id)'
+        ))
+        if engine.dialect.name == 'sqlite':
+            for statement in SQLITE_DESCRIPTION_INDEX:
+                connection.execute(text(statement))
+            connection.execute(text(
+                "INSERT INTO operations_fts (operations_fts) VALUES ('rebuild')"
+            ))
+            connection.execute(text('ANALYZE'))
+        elif engine.dialect.name == 'postgresql':
+            for statement in POSTGRESQL_DESCRIPTION_INDEX:
+                connection.execute(text(statement))
+            connection.execute(text('ANALYZE operations'))
+
+
+def page(user_id: int, filters: OperationFilter, dialect_name: str, limit: int = 50):
+    """First page statement of the service for filters"""
+    key, descending = sort_keys[filters.sort]
+    column = getattr(Operation, key)
+    return (
+        select(Operation)
+        .where(Operation.user_id == user_id, *filter_conditions(filters, dialect_name))
+        .order_by(
+            *(
+                (column.desc(), Operation.id.desc())
+                if descending else
+                (column.asc(), Operation.id.asc())
+            )
+        )
+        .limit(limit + 1)
+    )
+
+
+def explain(engine, statement) -> str:
+    """Plan of statement"""
+    sql = str(statement.compile(engine, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN' if engine.dialect.name == 'sqlite' else 'EXPLAIN ANALYZE'
+    with engine.connect() as connection:
+        plan = connection.execute(text(f'{prefix} {sql}')).fetchall()
+    return '\n'.join(f'    {row[-1]}' for row in plan)
+
+
+def timed(func, repeat: int) -> float:
+    """Best of repeat runs in ms"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run(engine, user_id: int, indexed: bool, repeat: int):
+    """Print timings of the first pages and plans of their statements
+
+    With indexes the pages come from the service, which also walks the sort
+    index first on SQLite, without them from the plain LIKE statement.
+    """
+    dialect_name = engine.dialect.name if indexed else 'default'
+    session = Session(engine)
+    service = OperationService(session)
+    for name, filters in CASES.items():
+        statement = page(user_id, filters, dialect_name)
+        if indexed:
+            def func(filters=filters):
+                return service.get_list_raw(user_id, filters=filters, limit=50)['items']
+        else:
+            def func(statement=statement):
+                return session.execute(statement).all()[:50]
+        rows = len(func())
+        print(f'  {name}: {timed(func, repeat):.2f} ms, {rows} rows')
+        print(explain(engine, statement))
+    session.close()
+
+
+def main():
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default='sqlite:////tmp/operation_filters.db')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    started = time.perf_counter()
+    fill(engine, args.users, args.rows)
+    print(f'{args.rows} rows in {time.perf_counter() - started:.1f} s')
+
+    print('before: plain LIKE, no amount index')
+    run(engine, 1, False, args.repeat)
+
+    create_filter_indexes(engine)
+    print('after: ix_operations_user_id_amount_id, description index')
+    run(engine, 1, True, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
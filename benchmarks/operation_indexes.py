@@ -0,0 +1,143 @@
+"""Query plans and timings of operation reads before and after composite indexes
+
+    python benchmarks/operation_indexes.py --database-url sqlite:////tmp/bench.db
+
+Fills operations with synthetic rows, then runs the first page, a page
+filtered by kind and a deep keyset page with only ix_operations_user_id
+and again with the composite indexes from tables.Operation.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('JWT_SECRET', 'benchmark')
+
+# pylint: disable=wrong-import-position
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.tables import Base, Operation, User
+from app.models.operations import OperationFilter
+from app.services.operations import OperationService
+
+
+def fill(engine, users: int, rows: int, batch: int = 50000):
+    """Create schema without composite indexes and insert rows"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for index in Operation.__table__.indexes:
+            connection.execute(text(f'DROP INDEX {index.name}'))
+        connection.execute(text('CREATE INDEX ix_operations_user_id ON operations (user_id)'))
+        connection.execute(
+            insert(User),
+            [{'email': f'{i}@bench', 'username': f'user{i}'} for i in range(1, users + 1)],
+        )
+
+    start = date(2015, 1, 1)
+    random.seed(0)
+    with engine.begin() as connection:
+        for offset in range(0, rows, batch):
+            connection.execute(
+                insert(Operation),
+                [
+                    {
+                        'user_id': random.randint(1, users),
+                        'date': start + timedelta(days=random.randint(0, 365 * 8)),
+                        'kind': random.choice(('income', 'outcome', 'outcome')),
+                        'amount': Decimal(random.randint(100, 500000)) / 100,
+                        'description': None,
+                    }
+                    for _ in range(min(batch, rows - offset))
+                ],
+            )
+
+
+def explain(engine, statement) -> str:
+    """Plan of statement"""
+    sql = str(statement.compile(engine, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN' if engine.dialect.name == 'sqlite' else 'EXPLAIN ANALYZE'
+    with engine.connect() as connection:
+        plan = connection.execute(text(f'{prefix} {sql}')).fetchall()
+    return '\n'.join(f'    {row[-1]}' for row in plan)
+
+
+def timed(func, repeat: int) -> float:
+    """Best of repeat runs in ms"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run(engine, user_id: int, repeat: int):
+    """Print plans and timings of the service reads"""
+    session = Session(engine)
+    service = OperationService(session)
+    cursor = service.get_list(user_id, limit=1000).next_cursor
+    cases = {
+        'first page': lambda: service.get_list(user_id),
+        'first page, kind': lambda: service.get_list(
+            user_id, filters=OperationFilter(kind='income'),
+        ),
+        'page after 1000 rows': lambda: service.get_list(user_id, cursor=cursor),
+    }
+    ordered = (
+        select(Operation)
+        .where(Operation.user_id == user_id)
+        .order_by(Operation.date.desc(), Operation.id.desc())
+        .limit(101)
+    )
+    plans = {
+        'first page': ordered,
+        'first page, kind': ordered.where(Operation.kind == 'income'),
+    }
+
+    for name, func in cases.items():
+        print(f'  {name}: {timed(func, repeat):.2f} ms')
+        if name in plans:
+            print(explain(engine, plans[name]))
+    session.close()
+
+
+def main():
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default='sqlite:////tmp/operation_indexes.db')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    started = time.perf_counter()
+    fill(engine, args.users, args.rows)
+    print(f'{args.rows} rows in {time.perf_counter() - started:.1f} s')
+
+    print('before: ix_operations_user_id')
+    run(engine, 1, args.repeat)
+
+    with engine.begin() as connection:
+        for index in Operation.__table__.indexes:
+            index.create(connection)
+        connection.execute(text('DROP INDEX ix_operations_user_id'))
+        if engine.dialect.name == 'postgresql':
+            connection.execute(text('ANALYZE operations'))
+        else:
+            connection.execute(text('ANALYZE'))
+
+    print('after: ' + ', '.join(index.name for index in Operation.__table__.indexes))
+    run(engine, 1, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
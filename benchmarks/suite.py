@@ -0,0 +1,351 @@
+"""Throughput and latency of the main endpoints, results as json
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/suite.py --database-url sqlite:////tmp/benchmark.db --output before.json
+    python benchmarks/suite.py --database-url sqlite:////tmp/benchmark.db --compare before.json
+
+Fills the database with generate_data (unless --no-generate), then drives
+the app in-process through httpx ASGI transport, scenario after scenario:
+list, get, create, update, delete, sign-in, csv import and csv export.
+Settings are read from the environment as usual, so ASYNC_DATABASE=1 or
+pool settings can be benchmarked the same way. Same seed and arguments
+give the same data and the same request sequence.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    """Throughput and latency percentiles in ms"""
+    ordered = sorted(latencies)
+    if not ordered:
+        return {'requests': 0, 'errors': errors}
+
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(ordered) / elapsed, 1),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+
+async def measure(count: int, concurrency: int, request) -> dict:
+    """Run request(index) count times, at most concurrency at once
+
+    request returns False when the response is not the expected one.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(index: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            succeeded = await request(index)
+            latencies.append(time.perf_counter() - started)
+        if not succeeded:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(count)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def operation_body(rng: random.Random) -> dict:
+    """Json of a new operation"""
+    return {
+        'date': f'2024-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}',
+        'kind': rng.choice(('income', 'outcome', 'outcome', 'outcome')),
+        'amount': f'{rng.lognormvariate(3, 1.2):.2f}',
+        'description': rng.choice((None, 'groceries', 'coffee', 'taxi')),
+    }
+
+
+def import_file(rng: random.Random, rows: int) -> bytes:
+    """Csv in the export format"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=['date', 'kind', 'amount', 'description'])
+    writer.writeheader()
+    for _ in range(rows):
+        writer.writerow({**operation_body(rng), 'description': 'imported'})
+    return output.getvalue().encode()
+
+
+class Suite:
+    """Scenarios against one app and database"""
+    def __init__(self, client, args, rng: random.Random, headers: dict, ids: dict) -> None:
+        self.client = client
+        self.args = args
+        self.rng = rng
+        self.headers = headers
+        self.ids = ids
+        self.created: list[tuple[int, int]] = []
+
+    def user(self) -> int:
+        """Random user id"""
+        return self.rng.randint(1, self.args.users)
+
+    async def list(self, _index: int) -> bool:
+        """First page of operations"""
+        response = await self.client.get(
+            '/operations/',
+            params={'limit': 50},
+            headers=self.headers[self.user()],
+        )
+        return response.status_code == 200
+
+    async def get(self, _index: int) -> bool:
+        """One existing operation"""
+        user_id = self.user()
+        response = await self.client.get(
+            f'/operations/{self.rng.choice(self.ids[user_id])}',
+            headers=self.headers[user_id],
+        )
+        return response.status_code == 200
+
+    async def create(self, _index: int) -> bool:
+        """New operation, remembered for update and delete"""
+        user_id = self.user()
+        response = await self.client.post(
+            '/operations/',
+            json=operation_body(self.rng),
+            headers=self.headers[user_id],
+        )
+        if response.status_code != 200:
+            return False
+        self.created.append((user_id, response.json()['id']))
+        return True
+
+    async def update(self, index: int) -> bool:
+        """Replace an operation created before"""
+        user_id, operation_id = self.created[index % len(self.created)]
+        response = await self.client.put(
+            f'/operations/{operation_id}',
+            json=operation_body(self.rng),
+            headers=self.headers[user_id],
+        )
+        return response.status_code == 200
+
+    async def delete(self, _index: int) -> bool:
+        """Delete an operation created before"""
+        if not self.created:
+            return False
+        user_id, operation_id = self.created.pop()
+        response = await self.client.delete(
+            f'/operations/{operation_id}',
+            headers=self.headers[user_id],
+        )
+        return response.status_code == 204
+
+    async def sign_in(self, _index: int) -> bool:
+        """Password check and new token"""
+        response = await self.client.post(
+            '/auth/sign-in/',
+            data={'username': f'user{self.user()}', 'password': 'bench'},
+        )
+        return response.status_code == 200
+
+    async def import_csv(self, _index: int) -> bool:
+        """Upload a file and wait until the job is done"""
+        headers = self.headers[self.user()]
+        response = await self.client.post(
+            '/reports/import',
+            files={'file': ('import.csv', import_file(self.rng, self.args.import_rows))},
+            headers=headers,
+        )
+        if response.status_code != 202:
+            return False
+
+        job_id = response.json()['id']
+        while True:
+            job = (await self.client.get(f'/reports/import/{job_id}', headers=headers)).json()
+            if job['status'] in ('done', 'failed'):
+                return job['status'] == 'done'
+            await asyncio.sleep(0.01)
+
+    async def export_csv(self, _index: int) -> bool:
+        """Whole csv of a user"""
+        response = await self.client.get('/reports/export', headers=self.headers[self.user()])
+        return response.status_code == 200 and bool(response.content)
+
+    async def run(self) -> dict:
+        """All scenarios in order"""
+        # pylint: disable=import-outside-toplevel
+        from app.settings import settings
+
+        args = self.args
+        heavy = max(1, args.requests // 20)
+        scenarios = [
+            ('list', self.list, args.requests, args.concurrency),
+            ('get', self.get, args.requests, args.concurrency),
+            ('create', self.create, args.requests, args.concurrency),
+            ('update', self.update, args.requests, args.concurrency),
+            ('delete', self.delete, args.requests, args.concurrency),
+            # stays within the hashing queue, beyond it requests get 503
+            ('sign_in', self.sign_in, heavy, min(args.concurrency, settings.hashing_queue_size)),
+            ('import', self.import_csv, heavy, min(args.concurrency, settings.import_max_pending)),
+            ('export', self.export_csv, heavy, args.concurrency),
+        ]
+
+        await measure(args.warmup, args.concurrency, self.list)
+        results = {}
+        for name, request, count, concurrency in scenarios:
+            results[name] = await measure(count, concurrency, request)
+            print(f'{name:>8}: {results[name]}', file=sys.stderr)
+        return results
+
+
+def load_ids(database_url: str, users: int, per_user: int = 200) -> dict[int, list[int]]:
+    """Some operation ids of every user"""
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import create_engine, select
+    from app.tables import Operation
+
+    engine = create_engine(database_url)
+    with engine.connect() as connection:
+        ids = {
+            user_id: connection.execute(
+                select(Operation.id)
+                .where(Operation.user_id == user_id)
+                .order_by(Operation.id)
+                .limit(per_user)
+            ).scalars().all()
+            for user_id in range(1, users + 1)
+        }
+    engine.dispose()
+    return ids
+
+
+def git_commit() -> dict:
+    """Commit the results belong to"""
+    def git(*command: str) -> str:
+        return subprocess.run(
+            ['git', *command], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+
+    try:
+        return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', 'src'))}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+async def benchmark(args) -> dict:
+    """Run the suite against the app"""
+    # pylint: disable=import-outside-toplevel
+    import httpx
+    from app.app import app, shutdown
+    from app.models.auth import User
+    from app.services.auth import AuthService
+    from app.settings import settings
+
+    headers = {}
+    for user_id in range(1, args.users + 1):
+        token = AuthService.create_token(
+            User(id=user_id, email=f'user{user_id}@bench', username=f'user{user_id}'),
+        )
+        headers[user_id] = {'Authorization': f'Bearer {token.access_token}'}
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            suite = Suite(
+                client,
+                args,
+                random.Random(args.seed),
+                headers,
+                load_ids(args.database_url, args.users),
+            )
+            results = await suite.run()
+    finally:
+        shutdown()
+
+    return {
+        'meta': {
+            **git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': settings.database_url.split(':', 1)[0],
+            'async_database': settings.async_database,
+            'args': {key: value for key, value in vars(args).items() if key != 'compare'},
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, previous: dict):
+    """Print change of throughput and p95 against previous results"""
+    print(f"against {previous['meta'].get('commit')}:")
+    for name, result in current['results'].items():
+        before = previous['results'].get(name)
+        if not before or not before.get('requests') or not result.get('requests'):
+            continue
+        throughput = result['requests_per_second'] / before['requests_per_second'] - 1
+        latency = result['p95_ms'] / before['p95_ms'] - 1
+        print(f'{name:>8}: throughput {throughput:+.1%}, p95 {latency:+.1%}')
+
+
+def main():
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default='sqlite:////tmp/benchmark.db')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--operations', type=int, default=1000, help='per user')
+    parser.add_argument('--no-generate', action='store_true', help='reuse generated data')
+    parser.add_argument('--requests', type=int, default=1000, help='per scenario')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--import-rows', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results json here')
+    parser.add_argument('--compare', help='results json of a previous run')
+    args = parser.parse_args()
+
+    # settings are read at import of the app
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ.setdefault('JWT_SECRET', 'benchmark')
+    sys.path.insert(0, str(ROOT / 'src'))
+    sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+    if not args.no_generate:
+        # pylint: disable=import-outside-toplevel
+        from generate_data import generate
+        generate(args.database_url, args.users, args.operations, seed=args.seed)
+
+    results = asyncio.run(benchmark(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text(encoding='utf-8')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Operation filter indexes
+
+Revision ID: 3e8c51a9f4d7
+Revises: d41f7b9e2a60
+Create Date: 2026-10-18 17:05:12.804733
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8c51a9f4d7'
+down_revision = 'd41f7b9e2a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE operations_fts USING fts5("
+            "description, content='operations', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER operations_fts_insert AFTER INSERT ON operations BEGIN "
+            "INSERT INTO operations_fts (rowid, description) "
+            "VALUES (new.id, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER operations_fts_delete AFTER DELETE ON operations BEGIN "
+            "INSERT INTO operations_fts (operations_fts, rowid, description) "
+            "VALUES ('delete', old.id, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER operations_fts_update AFTER UPDATE OF description ON operations BEGIN "
+            "INSERT INTO operations_fts (operations_fts, rowid, description) "
+            "VALUES ('delete', old.id, old.description); "
+            "INSERT INTO operations_fts (rowid, description) "
+            "VALUES (new.id, new.description); END"
+        )
+        # external content table, fill it from the existing rows
+        op.execute("INSERT INTO operations_fts (operations_fts) VALUES ('rebuild')")
+
+    # CONCURRENTLY can not run inside a transaction, other dialects ignore it
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_operations_user_id_amount_id',
+            'operations',
+            ['user_id', 'amount', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        if dialect == 'postgresql':
+            op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+            op.execute(
+                'CREATE INDEX CONCURRENTLY ix_operations_user_id_description_trgm '
+                'ON operations USING gin (user_id, description gin_trgm_ops)'
+            )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS operations_fts_{trigger}')
+        op.execute('DROP TABLE IF EXISTS operations_fts')
+    if dialect == 'postgresql':
+        op.drop_index('ix_operations_user_id_description_trgm', table_name='operations')
+    op.drop_index('ix_operations_user_id_amount_id', table_name='operations')
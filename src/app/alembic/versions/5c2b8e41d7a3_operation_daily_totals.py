@@ -0,0 +1,37 @@
+"""Operation daily totals
+
+Revision ID: 5c2b8e41d7a3
+Revises: e078de1fe06e
+Create Date: 2026-10-18 12:40:11.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2b8e41d7a3'
+down_revision = 'e078de1fe06e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('operation_daily_totals',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'date', 'kind')
+    )
+    op.execute(
+        'INSERT INTO operation_daily_totals (user_id, date, kind, amount, count) '
+        'SELECT user_id, date, kind, SUM(amount), COUNT(*) FROM operations '
+        'GROUP BY user_id, date, kind'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('operation_daily_totals')
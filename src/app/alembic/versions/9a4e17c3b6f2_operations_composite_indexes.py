@@ -0,0 +1,61 @@
+"""Operations composite indexes
+
+Revision ID: 9a4e17c3b6f2
+Revises: 5c2b8e41d7a3
+Create Date: 2026-10-18 13:05:47.918062
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4e17c3b6f2'
+down_revision = '5c2b8e41d7a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can not run inside a transaction, other dialects ignore it
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_operations_user_id_date_id',
+            'operations',
+            ['user_id', sa.text('date DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_operations_user_id_kind_date_id',
+            'operations',
+            ['user_id', 'kind', sa.text('date DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_operations_user_id',
+            table_name='operations',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_operations_user_id',
+            'operations',
+            ['user_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_operations_user_id_kind_date_id',
+            table_name='operations',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_operations_user_id_date_id',
+            table_name='operations',
+            postgresql_concurrently=True,
+        )
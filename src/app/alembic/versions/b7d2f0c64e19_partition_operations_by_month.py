@@ -0,0 +1,109 @@
+"""Partition operations by month
+
+Revision ID: b7d2f0c64e19
+Revises: 3e8c51a9f4d7
+Create Date: 2026-10-18 19:42:07.318520
+
+Rewrites operations on PostgreSQL, the table is locked while its rows
+are copied. SQLite keeps the plain table.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f0c64e19'
+down_revision = '3e8c51a9f4d7'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    'CREATE INDEX ix_operations_user_id_date_id ON operations (user_id, date DESC, id DESC)',
+    'CREATE INDEX ix_operations_user_id_kind_date_id '
+    'ON operations (user_id, kind, date DESC, id DESC)',
+    'CREATE INDEX ix_operations_user_id_amount_id ON operations (user_id, amount, id)',
+    'CREATE INDEX ix_operations_user_id_change_seq_id ON operations (user_id, change_seq, id)',
+    'CREATE INDEX ix_operations_user_id_description_trgm '
+    'ON operations USING gin (user_id, description gin_trgm_ops)',
+)
+INDEX_NAMES = (
+    'ix_operations_user_id_date_id',
+    'ix_operations_user_id_kind_date_id',
+    'ix_operations_user_id_amount_id',
+    'ix_operations_user_id_change_seq_id',
+    'ix_operations_user_id_description_trgm',
+)
+COLUMNS = 'id, user_id, date, kind, amount, description, change_seq'
+
+
+def rename_old(name: str):
+    """Rename operations and drop its indexes, their names are taken again"""
+    for index in INDEX_NAMES:
+        op.execute(f'DROP INDEX IF EXISTS {index}')
+    op.execute(f'ALTER TABLE operations RENAME TO {name}')
+    op.execute(f'ALTER TABLE {name} RENAME CONSTRAINT operations_pkey TO {name}_pkey')
+    op.execute('ALTER SEQUENCE operations_id_seq OWNED BY NONE')
+
+
+def create_new(name: str):
+    """Copy rows of old table to operations, drop it, index operations"""
+    op.execute(f'INSERT INTO operations ({COLUMNS}) SELECT {COLUMNS} FROM {name}')
+    op.execute(f'DROP TABLE {name}')
+    op.execute('ALTER SEQUENCE operations_id_seq OWNED BY operations.id')
+    for statement in INDEXES:
+        op.execute(statement)
+    op.execute('ANALYZE operations')
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    rename_old('operations_unpartitioned')
+    op.execute(
+        'CREATE TABLE operations ('
+        "id INTEGER NOT NULL DEFAULT nextval('operations_id_seq'), "
+        'user_id INTEGER REFERENCES users (id), '
+        'date DATE NOT NULL, '
+        'kind VARCHAR, '
+        'amount NUMERIC(10, 2), '
+        'description VARCHAR, '
+        "change_seq BIGINT NOT NULL DEFAULT '0', "
+        'PRIMARY KEY (id, date)'
+        ') PARTITION BY RANGE (date)'
+    )
+    op.execute('CREATE TABLE operations_default PARTITION OF operations DEFAULT')
+    # months of existing rows and three ahead, python -m app.create_partitions
+    # keeps creating them from now on
+    op.execute(
+        'DO $$ DECLARE month date; BEGIN '
+        'FOR month IN SELECT generate_series('
+        "date_trunc('month', COALESCE(MIN(date), current_date)), "
+        "date_trunc('month', GREATEST(MAX(date), current_date)) + interval '3 months', "
+        "interval '1 month')::date FROM operations_unpartitioned LOOP "
+        "EXECUTE format('CREATE TABLE %I PARTITION OF operations FOR VALUES FROM (%L) TO (%L)', "
+        "'operations_y' || to_char(month, 'YYYY\"m\"MM'), month, "
+        "(month + interval '1 month')::date); "
+        'END LOOP; END $$'
+    )
+    create_new('operations_unpartitioned')
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    rename_old('operations_partitioned')
+    op.execute(
+        'CREATE TABLE operations ('
+        "id INTEGER NOT NULL DEFAULT nextval('operations_id_seq'), "
+        'user_id INTEGER REFERENCES users (id), '
+        'date DATE, '
+        'kind VARCHAR, '
+        'amount NUMERIC(10, 2), '
+        'description VARCHAR, '
+        "change_seq BIGINT NOT NULL DEFAULT '0', "
+        'PRIMARY KEY (id)'
+        ')'
+    )
+    # partitions go with their table
+    create_new('operations_partitioned')
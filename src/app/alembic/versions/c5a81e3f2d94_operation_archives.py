@@ -0,0 +1,43 @@
+"""Operation archives
+
+Revision ID: c5a81e3f2d94
+Revises: b7d2f0c64e19
+Create Date: 2026-10-18 21:05:52.640318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a81e3f2d94'
+down_revision = 'b7d2f0c64e19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('operation_archives',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date_from', sa.Date(), nullable=False),
+    sa.Column('date_to', sa.Date(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_operation_archives_user_id_date_from',
+        'operation_archives',
+        ['user_id', 'date_from'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_operation_archives_user_id_date_from',
+        table_name='operation_archives',
+    )
+    op.drop_table('operation_archives')
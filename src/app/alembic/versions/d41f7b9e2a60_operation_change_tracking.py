@@ -0,0 +1,68 @@
+"""Operation change tracking
+
+Revision ID: d41f7b9e2a60
+Revises: 9a4e17c3b6f2
+Create Date: 2026-10-18 15:20:34.511207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41f7b9e2a60'
+down_revision = '9a4e17c3b6f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users',
+        sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False),
+    )
+    op.add_column(
+        'operations',
+        sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False),
+    )
+    # ids are unique and increasing, good enough as first change numbers
+    op.execute('UPDATE operations SET change_seq = id')
+    op.execute(
+        'UPDATE users SET change_seq = COALESCE('
+        '(SELECT MAX(id) FROM operations WHERE operations.user_id = users.id), 0)'
+    )
+    op.create_table('operation_tombstones',
+    sa.Column('operation_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('operation_id', 'change_seq')
+    )
+    op.create_index(
+        'ix_operation_tombstones_user_id_change_seq_operation_id',
+        'operation_tombstones',
+        ['user_id', 'change_seq', 'operation_id'],
+        unique=False,
+    )
+    # CONCURRENTLY can not run inside a transaction, other dialects ignore it
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_operations_user_id_change_seq_id',
+            'operations',
+            ['user_id', 'change_seq', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_operations_user_id_change_seq_id', table_name='operations')
+    op.drop_index(
+        'ix_operation_tombstones_user_id_change_seq_operation_id',
+        table_name='operation_tombstones',
+    )
+    op.drop_table('operation_tombstones')
+    with op.batch_alter_table('operations') as batch_op:
+        batch_op.drop_column('change_seq')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('change_seq')
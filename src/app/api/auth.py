@@ -2,7 +2,7 @@
 from fastapi import Depends, APIRouter, status
 from fastapi.security import OAuth2PasswordRequestForm
 from ..models.auth import UserCreate, Token, User
-from ..services.auth import AuthService, get_current_user
+from ..services.auth import AsyncAuthService, get_current_user
 
 
 router = APIRouter(
@@ -16,24 +16,24 @@ router = APIRouter(
     response_model=Token,
     status_code=status.HTTP_201_CREATED,
 )
-def sign_up(
+async def sign_up(
     user_data: UserCreate,
-    auth_service: AuthService = Depends(),
+    auth_service: AsyncAuthService = Depends(),
 ):
     """Registration"""
-    return auth_service.register_new_user(user_data)
+    return await auth_service.register_new_user(user_data)
 
 
 @router.post(
     '/sign-in/',
     response_model=Token,
 )
-def sign_in(
+async def sign_in(
     auth_data: OAuth2PasswordRequestForm = Depends(),
-    auth_service: AuthService = Depends(),
+    auth_service: AsyncAuthService = Depends(),
 ):
     """Autorization"""
-    return auth_service.authenticate_user(
+    return await auth_service.authenticate_user(
         auth_data.username,
         auth_data.password,
     )
@@ -0,0 +1,16 @@
+"""Api urls and views for diagnostics"""
+from fastapi import APIRouter
+from ..database import pool_metrics
+from ..models.diagnostics import PoolStats
+
+
+router = APIRouter(
+    prefix='/diagnostics',
+    tags=['Diagnostics'],
+)
+
+
+@router.get('/pool', response_model=list[PoolStats])
+def get_pool_stats():
+    """Connection pool state, checkout counters and wait histogram"""
+    return [metrics.snapshot() for metrics in pool_metrics]
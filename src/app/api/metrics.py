@@ -0,0 +1,34 @@
+"""Api url for Prometheus scraping"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..database import pool_metrics
+from ..instrumentation import (
+    collect_pools,
+    collect_cache,
+    instrumentation,
+)
+from ..metrics import PrometheusText
+from ..services.analytics import columns_cache
+from ..services.response_cache import response_cache
+from ..services.token_cache import token_cache
+from ..services.write_queue import write_queue
+from ..settings import settings
+
+
+router = APIRouter(
+    tags=['Diagnostics'],
+)
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+def get_metrics():
+    """Request, SQL, pool, cache and group commit metrics in Prometheus text format"""
+    text = PrometheusText()
+    instrumentation.collect(text)
+    collect_pools(text, pool_metrics)
+    collect_cache(text, 'token_cache', 'Token cache', token_cache.stats())
+    collect_cache(text, 'response_cache', 'Response cache', response_cache.stats())
+    collect_cache(text, 'analytics_cache', 'Analytics columns cache', columns_cache.stats())
+    if settings.group_commit:
+        write_queue.collect(text)
+    return PlainTextResponse(text.render(), media_type=PrometheusText.media_type)
@@ -5,12 +5,26 @@ from fastapi import (
     APIRouter,
     Response,
     HTTPException,
+    Query,
     status
 )
+from ..serialization import RawJSONResponse
+from ..settings import settings
 from ..tables import User
 from ..services.auth import get_current_user
-from ..services.operations import OperationService
-from ..models.operations import Operation, OperationKind, OperationCreate, OperationUpdate
+from ..services.operations import AsyncOperationReader, AsyncOperationService
+from ..services.response_cache import ConditionalRead
+from ..services.write_queue import write_queue
+from ..models.operations import (
+    Operation,
+    OperationBatch,
+    OperationChanges,
+    OperationFilter,
+    OperationBatchResult,
+    OperationCreate,
+    OperationUpdate,
+    OperationsPage,
+)
 
 
 router = APIRouter(
@@ -19,35 +33,104 @@ router = APIRouter(
 )
 
 
-@router.get('/', response_model=list[Operation])
-def get_operations(
-    kind: Optional[OperationKind] = None,
-    user: User = Depends(get_current_user),
-    service: OperationService = Depends(),
-
+@router.get('/', response_model=OperationsPage)
+async def get_operations(
+    filters: OperationFilter = Depends(),
+    limit: int = Query(
+        settings.operations_page_size,
+        ge=1,
+        le=settings.operations_max_page_size,
+    ),
+    cursor: Optional[str] = None,
+    service: AsyncOperationReader = Depends(),
+    conditional: ConditionalRead = Depends(),
 ):
-    """Get all operations"""
-    return service.get_list(user_id=user.id, kind=kind)
+    """Get page of operations, pass next_cursor to get the next one
+
+    A cursor belongs to the sort it came with. Answers 304 to
+    If-None-Match with the ETag of unchanged data.
+    """
+    cached = conditional.cached()
+    if cached:
+        return cached
+
+    page = await service.get_list_raw(
+        user_id=conditional.user.id,
+        filters=filters,
+        limit=limit,
+        cursor=cursor,
+    )
+    return conditional.respond(RawJSONResponse(page))
+
+
+@router.get('/changes', response_model=OperationChanges)
+async def get_operation_changes(
+    since: Optional[str] = None,
+    limit: int = Query(
+        settings.operations_page_size,
+        ge=1,
+        le=settings.operations_max_page_size,
+    ),
+    service: AsyncOperationReader = Depends(),
+    conditional: ConditionalRead = Depends(),
+):
+    """Operations created, updated and deleted after since, pass next_cursor next time
+
+    Without since returns all operations. Repeat with next_cursor while has_more.
+    """
+    cached = conditional.cached()
+    if cached:
+        return cached
+
+    changes = await service.get_changes_raw(
+        user_id=conditional.user.id,
+        cursor=since,
+        limit=limit,
+    )
+    return conditional.respond(RawJSONResponse(changes))
 
 
 @router.post('/', response_model=Operation)
-def create_operation(
+async def create_operation(
     operation_data: OperationCreate,
     user: User = Depends(get_current_user),
-    service: OperationService = Depends(),
+    service: AsyncOperationService = Depends(),
 ):
-    """Create new operation"""
-    return service.create(user_id=user.id, creation_data=operation_data)
+    """Create new operation
+
+    With group_commit it is written together with concurrent creates, the
+    answer still comes after its commit.
+    """
+    if settings.group_commit:
+        return await write_queue.create(user.id, operation_data)
+    return await service.create(user_id=user.id, creation_data=operation_data)
+
+
+@router.post('/batch', response_model=OperationBatchResult)
+async def batch_operations(
+    batch_data: OperationBatch,
+    user: User = Depends(get_current_user),
+    service: AsyncOperationService = Depends(),
+):
+    """Create, edit and delete many operations in one transaction"""
+    size = len(batch_data.create) + len(batch_data.update) + len(batch_data.delete)
+    if size > settings.operations_max_batch_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f'At most {settings.operations_max_batch_size} items per batch',
+        )
+
+    return await service.apply_batch(user_id=user.id, batch=batch_data)
 
 
 @router.get('/{operation_id}', response_model=Operation)
-def get_operation(
+async def get_operation(
     operation_id: int,
     user: User = Depends(get_current_user),
-    service: OperationService = Depends(),
+    service: AsyncOperationReader = Depends(),
 ):
     """Get operation by id"""
-    result = service.get(user_id=user.id, operation_id=operation_id)
+    result = await service.get(user_id=user.id, operation_id=operation_id)
 
     if not result:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
@@ -56,14 +139,14 @@ def get_operation(
 
 
 @router.put('/{operation_id}', response_model=Operation)
-def update_operation(
+async def update_operation(
     operation_id: int,
     operation_data: OperationUpdate,
     user: User = Depends(get_current_user),
-    service: OperationService = Depends(),
+    service: AsyncOperationService = Depends(),
 ):
     """Edit operation by id"""
-    result = service.update(
+    result = await service.update(
         user_id=user.id,
         operation_id=operation_id,
         operation_data=operation_data
@@ -76,13 +159,13 @@ def update_operation(
 
 
 @router.delete('/{operation_id}')
-def delete_operation(
+async def delete_operation(
     operation_id: int,
     user: User = Depends(get_current_user),
-    service: OperationService = Depends(),
+    service: AsyncOperationService = Depends(),
 ):
     """Delete operation by id"""
-    if not service.delete(user_id=user.id, operation_id=operation_id):
+    if not await service.delete(user_id=user.id, operation_id=operation_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
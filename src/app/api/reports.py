@@ -1,15 +1,29 @@
 """Api urls and views for reports operations"""
+from datetime import date
+from typing import Optional
 from fastapi import (
     Depends,
-    BackgroundTasks,
     APIRouter,
     File,
+    HTTPException,
     UploadFile,
+    status,
 )
 from fastapi.responses import StreamingResponse
 from ..models.auth import User
+from ..models.reports import (
+    Analytics,
+    Balance,
+    BalanceBucket,
+    ImportJob,
+    SummaryPeriod,
+)
+from ..serialization import RawJSONResponse
+from ..services.analytics import AsyncAnalyticsReader
 from ..services.auth import get_current_user
-from ..services.reports import ReportsService
+from ..services.import_jobs import import_jobs
+from ..services.reports import AsyncReportsReader
+from ..services.response_cache import ConditionalRead
 
 
 router = APIRouter(
@@ -18,31 +32,105 @@ router = APIRouter(
 )
 
 
-@router.post('/import')
+@router.post(
+    '/import',
+    response_model=ImportJob,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 def import_csv(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     user: User = Depends(get_current_user),
-    report_service: ReportsService = Depends(),
 ):
     """import file with operations"""
-    background_tasks.add_task(
-        report_service.import_csv,
-        user.id,
-        file.file
-    )
+    return import_jobs.submit(user.id, file.file)
+
+
+@router.get('/import/{job_id}', response_model=ImportJob)
+def get_import_job(
+    job_id: str,
+    user: User = Depends(get_current_user),
+):
+    """import progress and status"""
+    job = import_jobs.get(job_id)
+
+    if not job or job.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    return job
 
 
 @router.get('/export')
-def export_csv(
+async def export_csv(
     user: User = Depends(get_current_user),
-    report_service: ReportsService = Depends(),
+    report_service: AsyncReportsReader = Depends(),
+    conditional: ConditionalRead = Depends(),
 ):
-    """export file with operations"""
+    """export file with operations, 304 to If-None-Match of unchanged data"""
+    cached = conditional.cached()
+    if cached:
+        return cached
+
     report = report_service.export_csv(user_id=user.id)
 
-    return StreamingResponse(
+    return conditional.stream(StreamingResponse(
         report,
         media_type='text/csv',
         headers={'Content-Disposition': 'attachment; filename=report.csv'},
+    ))
+
+
+@router.get('/summary', response_model=list[BalanceBucket])
+async def get_summary(
+    period: SummaryPeriod = SummaryPeriod.MONTH,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user: User = Depends(get_current_user),
+    report_service: AsyncReportsReader = Depends(),
+):
+    """income, outcome and balance per day, week or month"""
+    return await report_service.get_summary(
+        user_id=user.id,
+        period=period,
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+
+@router.get('/summary/balance', response_model=Balance)
+async def get_balance(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user: User = Depends(get_current_user),
+    report_service: AsyncReportsReader = Depends(),
+):
+    """income, outcome and balance of date range"""
+    return await report_service.get_balance(
+        user_id=user.id,
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+
+@router.get('/analytics', response_model=Analytics)
+async def get_analytics(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    analytics_service: AsyncAnalyticsReader = Depends(),
+    conditional: ConditionalRead = Depends(),
+):
+    """monthly totals, amount statistics and running balance of date range
+
+    Archived operations are included. Answers 304 to If-None-Match with
+    the ETag of unchanged data.
+    """
+    cached = conditional.cached()
+    if cached:
+        return cached
+
+    analytics = await analytics_service.get_analytics(
+        user_id=conditional.user.id,
+        version=conditional.version,
+        date_from=date_from,
+        date_to=date_to,
     )
+    return conditional.respond(RawJSONResponse(analytics))
@@ -1,7 +1,22 @@
 """FastAPI application"""
 from fastapi import FastAPI
 from .api import router
+from .instrumentation import MetricsMiddleware
+from .settings import settings
+from .services.hashing import password_hasher
+from .services.import_jobs import import_jobs
+from .services.write_queue import write_queue
 
 
 app = FastAPI()
 app.include_router(router)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+
+@app.on_event('shutdown')
+def shutdown():
+    """Write queued creates, wait for background imports, stop worker processes"""
+    write_queue.shutdown()
+    import_jobs.shutdown()
+    password_hasher.shutdown()
@@ -0,0 +1,43 @@
+"""Archive old operations: python -m app.archive_operations [--user-id ID] [--months N]"""
+import argparse
+from datetime import date
+
+from .database import Session, engine
+from .services.archive import ArchiveService
+from .services.partitions import add_months, drop_empty_partitions, month_start
+from .settings import settings
+
+
+def main():
+    """Run from cron, monthly or more often
+
+    Operations dated before the first day of the month N months ago are
+    moved to operation_archives. Running servers keep cached list pages
+    of an archived user until the user writes again.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--user-id', type=int, help='only this user')
+    parser.add_argument(
+        '--months',
+        type=int,
+        default=settings.archive_after_months,
+        help='months of operations to keep in the operations table',
+    )
+    args = parser.parse_args()
+    before = add_months(month_start(date.today()), -args.months)
+
+    session = Session()
+    try:
+        archived = ArchiveService(session).archive(before, args.user_id)
+    finally:
+        session.close()
+    print(f'archived {archived} operations dated before {before}')
+
+    if args.user_id is None:
+        with engine.begin() as connection:
+            for name in drop_empty_partitions(connection, before):
+                print(f'dropped {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Create monthly partitions ahead: python -m app.create_partitions [--months N]"""
+import argparse
+
+from .database import engine
+from .services.partitions import ensure_partitions
+from .settings import settings
+
+
+def main():
+    """Run from cron, daily or at least monthly, on PostgreSQL"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--months',
+        type=int,
+        default=settings.partition_months_ahead,
+        help='partitions to have after the current month',
+    )
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        created = ensure_partitions(connection, args.months)
+    for name in created:
+        print(name)
+
+
+if __name__ == '__main__':
+    main()
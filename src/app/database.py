@@ -1,10 +1,41 @@
 """Database settings"""
+from itertools import count
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession as AsyncSessionType, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from .settings import settings
+from .instrumentation import instrumentation
+from .pool import PoolMetrics, TimedAsyncQueuePool, TimedQueuePool
 
 
-engine = create_engine(settings.database_url)
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def get_engine_args(database_url: str, poolclass: type) -> dict:
+    """Pool settings, SQLite keeps its default pool"""
+    if make_url(database_url).get_backend_name() == 'sqlite':
+        # sessions are opened and closed in different threadpool threads
+        return {'connect_args': {'check_same_thread': False}}
+
+    return {
+        'poolclass': poolclass,
+        'pool_size': settings.db_pool_size,
+        'max_overflow': settings.db_max_overflow,
+        'pool_timeout': settings.db_pool_timeout,
+        'pool_recycle': settings.db_pool_recycle,
+        'pool_pre_ping': settings.db_pool_pre_ping,
+    }
+
+
+engine = create_engine(
+    settings.database_url,
+    **get_engine_args(settings.database_url, TimedQueuePool),
+)
+pool_metrics = [PoolMetrics('primary', engine)]
 
 
 Session = sessionmaker(
@@ -14,6 +45,70 @@ Session = sessionmaker(
 )
 
 
+def get_read_database_urls() -> list[str]:
+    """Urls of read replicas, empty without replicas"""
+    if not settings.read_database_url:
+        return []
+    return [url.strip() for url in settings.read_database_url.split(',') if url.strip()]
+
+
+def to_async_url(database_url: str) -> str:
+    """database_url with async driver"""
+    url = make_url(database_url)
+    return str(url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]))
+
+
+def get_async_database_url() -> str:
+    """async_database_url or database_url with async driver"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    return to_async_url(settings.database_url)
+
+
+read_engines = [
+    create_engine(url, **get_engine_args(url, TimedQueuePool))
+    for url in get_read_database_urls()
+]
+pool_metrics.extend(
+    PoolMetrics(f'read{index}', read_engine)
+    for index, read_engine in enumerate(read_engines)
+)
+
+async_engine = None
+async_read_engines = []
+AsyncSession = None# pylint: disable=invalid-name
+if settings.async_database:
+    async_engine = create_async_engine(
+        get_async_database_url(),
+        **get_engine_args(get_async_database_url(), TimedAsyncQueuePool),
+    )
+    pool_metrics.append(PoolMetrics('async', async_engine.sync_engine))
+    async_read_engines = [
+        create_async_engine(
+            to_async_url(url),
+            **get_engine_args(url, TimedAsyncQueuePool),
+        )
+        for url in get_read_database_urls()
+    ]
+    pool_metrics.extend(
+        PoolMetrics(f'async_read{index}', read_engine.sync_engine)
+        for index, read_engine in enumerate(async_read_engines)
+    )
+    AsyncSession = sessionmaker(# pylint: disable=invalid-name
+        async_engine,
+        class_=AsyncSessionType,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+for metrics in pool_metrics:
+    metrics.attach()
+    if settings.metrics_enabled:
+        instrumentation.instrument_engine(metrics.engine, metrics.name)
+
+
 def get_session() -> Session:
     """get session"""
     session = Session()
@@ -21,3 +116,29 @@ def get_session() -> Session:
         yield session
     finally:
         session.close()
+
+
+async def get_async_session() -> AsyncSessionType:
+    """get async session"""
+    async with AsyncSession() as session:
+        yield session
+
+
+read_turns = count()
+
+
+def read_session() -> Session:
+    """Session on the next read replica in turn, on the primary without replicas"""
+    if not read_engines:
+        return Session()
+    return Session(bind=read_engines[next(read_turns) % len(read_engines)])
+
+
+def async_read_session() -> AsyncSessionType:
+    """Async session on the next read replica in turn, on the primary without replicas"""
+    if not async_read_engines:
+        return AsyncSession()
+    return AsyncSession(bind=async_read_engines[next(read_turns) % len(async_read_engines)])
+
+
+get_api_session = get_async_session if settings.async_database else get_session
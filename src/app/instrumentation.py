@@ -0,0 +1,214 @@
+"""Request and SQL statement metrics"""
+import logging
+import time
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import HistogramFamily, PrometheusText
+from .settings import settings
+
+
+REQUEST_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+STATEMENT_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+STATEMENTS_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+UNMATCHED_ROUTE = 'unmatched'
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:# pylint: disable=too-few-public-methods
+    """SQL statements run while serving one request"""
+    __slots__ = ('statements', 'sql_ms')
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.sql_ms = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar('current_request', default=None)
+
+
+class Instrumentation:# pylint: disable=too-many-instance-attributes
+    """Collectors of request and statement timings"""
+    def __init__(self, slow_query_ms: float) -> None:
+        self.slow_query_ms = slow_query_ms
+        self.request_ms = HistogramFamily(('method', 'route', 'status'), REQUEST_BUCKETS_MS)
+        self.request_statements = HistogramFamily(('method', 'route'), STATEMENTS_BUCKETS)
+        self.request_sql_ms = HistogramFamily(('method', 'route'), REQUEST_BUCKETS_MS)
+        self.statement_ms = HistogramFamily(('engine', 'verb'), STATEMENT_BUCKETS_MS)
+        self.in_flight: dict[str, int] = {}
+        self.slow_queries = 0
+        self.routes: dict[object, str] = {}
+        self.lock = Lock()
+
+    def instrument_engine(self, engine: Engine, name: str):
+        """Time every cursor execute of engine"""
+        def before_cursor_execute(conn, *_):
+            conn.info['statement_started'] = time.perf_counter()
+
+        def after_cursor_execute(conn, _cursor, statement, *_):
+            started = conn.info.pop('statement_started', None)
+            if started is not None:
+                self.observe_statement(name, statement, (time.perf_counter() - started) * 1000)
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+    def observe_statement(self, engine: str, statement: str, duration_ms: float):
+        """Count statement globally and in the current request, log it when slow"""
+        verb = statement.lstrip()[:16].partition(' ')[0].upper()
+        self.statement_ms.child(engine, verb).observe(duration_ms)
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.sql_ms += duration_ms
+
+        if self.slow_query_ms and duration_ms >= self.slow_query_ms:
+            with self.lock:
+                self.slow_queries += 1
+            # parameters are not logged, they hold user data and password hashes
+            logger.warning('slow query %.1f ms on %s: %s', duration_ms, engine, statement)
+
+    def route_of(self, scope: dict) -> str:
+        """Path template of the matched route, bounded label values"""
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+
+        route = self.routes.get(endpoint)
+        if route is None:
+            paths = {
+                getattr(item, 'endpoint', None): item.path
+                for item in scope['app'].routes
+            }
+            route = self.routes.setdefault(endpoint, paths.get(endpoint, UNMATCHED_ROUTE))
+        return route
+
+    def begin(self, method: str):
+        """Request started"""
+        with self.lock:
+            self.in_flight[method] = self.in_flight.get(method, 0) + 1
+
+    def end(self, scope: dict, status: int, duration_ms: float, stats: RequestStats):
+        """Request finished"""
+        method = scope['method']
+        with self.lock:
+            self.in_flight[method] -= 1
+
+        route = self.route_of(scope)
+        self.request_ms.child(method, route, str(status)).observe(duration_ms)
+        self.request_statements.child(method, route).observe(stats.statements)
+        self.request_sql_ms.child(method, route).observe(stats.sql_ms)
+
+    def collect(self, text: PrometheusText):
+        """Add request and statement metrics"""
+        with self.lock:
+            in_flight = list(self.in_flight.items())
+            slow_queries = self.slow_queries
+
+        text.scalar(
+            'http_requests_in_flight', 'gauge', 'Requests being served',
+            [({'method': method}, count) for method, count in in_flight],
+        )
+        text.histogram(
+            'http_request_duration_ms', 'Request latency until the last body chunk',
+            self.request_ms.snapshot(),
+        )
+        text.histogram(
+            'http_request_sql_statements', 'SQL statements run per request',
+            self.request_statements.snapshot(),
+        )
+        text.histogram(
+            'http_request_sql_duration_ms', 'Time spent in SQL statements per request',
+            self.request_sql_ms.snapshot(),
+        )
+        text.histogram(
+            'db_statement_duration_ms', 'SQL statement latency',
+            self.statement_ms.snapshot(),
+        )
+        text.scalar(
+            'db_slow_statements_total', 'counter',
+            f'Statements slower than {self.slow_query_ms} ms',
+            [({}, slow_queries)],
+        )
+
+
+class MetricsMiddleware:# pylint: disable=too-few-public-methods
+    """ASGI middleware timing requests and their SQL statements
+
+    Plain ASGI instead of BaseHTTPMiddleware, so streaming responses are
+    not buffered and the request context reaches threadpool views.
+    """
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        instrumentation.begin(scope['method'])
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            current_request.reset(token)
+            instrumentation.end(scope, status, (time.perf_counter() - started) * 1000, stats)
+
+
+def collect_pools(text: PrometheusText, pools: list):
+    """Add PoolMetrics snapshots"""
+    snapshots = [pool.snapshot() for pool in pools]
+    gauges = {
+        'size': 'Pool size',
+        'checked_out': 'Connections in use',
+        'checked_in': 'Idle connections',
+        'overflow': 'Connections above pool size',
+    }
+    counters = {
+        'connects': 'New DBAPI connections',
+        'checkouts': 'Connections taken from pool',
+        'checkins': 'Connections returned to pool',
+        'invalidations': 'Connections invalidated',
+        'timeouts': 'Checkouts failed after pool_timeout',
+    }
+    for key, description in gauges.items():
+        text.scalar(
+            f'db_pool_{key}', 'gauge', description,
+            [({'pool': snapshot['name']}, snapshot[key]) for snapshot in snapshots],
+        )
+    for key, description in counters.items():
+        text.scalar(
+            f'db_pool_{key}_total', 'counter', description,
+            [({'pool': snapshot['name']}, snapshot[key]) for snapshot in snapshots],
+        )
+    text.histogram(
+        'db_pool_wait_ms', 'Time waiting for a connection',
+        [({'pool': snapshot['name']}, snapshot['wait_ms']) for snapshot in snapshots],
+    )
+
+
+def collect_cache(text: PrometheusText, name: str, description: str, stats: dict):
+    """Add stats() of a cache, hits and misses are counters, the rest gauges"""
+    for key, value in stats.items():
+        if key in ('hits', 'misses'):
+            text.scalar(f'{name}_{key}_total', 'counter', f'{description} {key}', [({}, value)])
+        else:
+            text.scalar(f'{name}_{key}', 'gauge', f'{description} {key}', [({}, value)])
+
+
+instrumentation = Instrumentation(settings.slow_query_ms)
@@ -0,0 +1,109 @@
+"""In-process metrics"""
+from bisect import bisect_left
+from threading import Lock
+from typing import Optional
+
+
+class Histogram:
+    """Thread-safe counts of observed values per bucket upper bound"""
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = Lock()
+
+    def observe(self, value: float):
+        """Count value in the first bucket not below it"""
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> dict:
+        """Cumulative counts, the last bucket is +Inf"""
+        with self.lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip((*self.buckets, float('inf')), counts):
+            running += bucket_count
+            cumulative['+Inf' if bound == float('inf') else str(bound)] = running
+        return {'buckets': cumulative, 'count': count, 'sum': total}
+
+
+class HistogramFamily:
+    """Histograms with the same buckets per label values"""
+    def __init__(self, labels: tuple[str, ...], buckets: tuple[float, ...]) -> None:
+        self.labels = labels
+        self.buckets = buckets
+        self.children: dict[tuple[str, ...], Histogram] = {}
+        self.lock = Lock()
+
+    def child(self, *values: str) -> Histogram:
+        """Histogram of label values, created on first use"""
+        histogram = self.children.get(values)
+        if histogram is None:
+            with self.lock:
+                histogram = self.children.setdefault(values, Histogram(self.buckets))
+        return histogram
+
+    def snapshot(self) -> list[tuple[dict[str, str], dict]]:
+        """Label values and snapshot of every child"""
+        with self.lock:
+            children = list(self.children.items())
+        return [
+            (dict(zip(self.labels, values)), histogram.snapshot())
+            for values, histogram in children
+        ]
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    """Prometheus label set"""
+    if not labels:
+        return ''
+    escaped = (
+        str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        for value in labels.values()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class PrometheusText:
+    """Builder of Prometheus text exposition format"""
+    # charset is appended by PlainTextResponse
+    media_type = 'text/plain; version=0.0.4'
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def header(self, name: str, kind: str, description: str):
+        """HELP and TYPE lines"""
+        self.lines.append(f'# HELP {name} {description}')
+        self.lines.append(f'# TYPE {name} {kind}')
+
+    def sample(self, name: str, value: float, labels: Optional[dict[str, str]] = None):
+        """One sample line"""
+        self.lines.append(f'{name}{format_labels(labels or {})} {value}')
+
+    def scalar(self, name: str, kind: str, description: str, samples: list[tuple[dict, float]]):
+        """Counter or gauge with samples per label set"""
+        self.header(name, kind, description)
+        for labels, value in samples:
+            if value is not None:
+                self.sample(name, value, labels)
+
+    def histogram(self, name: str, description: str, samples: list[tuple[dict[str, str], dict]]):
+        """Histogram from Histogram.snapshot() per label set"""
+        self.header(name, 'histogram', description)
+        for labels, snapshot in samples:
+            for bound, count in snapshot['buckets'].items():
+                self.sample(f'{name}_bucket', count, {**labels, 'le': bound})
+            self.sample(f'{name}_sum', snapshot['sum'], labels)
+            self.sample(f'{name}_count', snapshot['count'], labels)
+
+    def render(self) -> str:
+        """Whole exposition"""
+        return '\n'.join(self.lines) + '\n'
@@ -0,0 +1,27 @@
+"""Models for diagnostics"""
+from typing import Optional
+
+from pydantic import BaseModel# pylint: disable=no-name-in-module
+
+
+class Histogram(BaseModel):# pylint: disable=too-few-public-methods
+    """Cumulative Histogram Model"""
+    buckets: dict[str, int]
+    count: int
+    sum: float
+
+
+class PoolStats(BaseModel):# pylint: disable=too-few-public-methods
+    """Connection Pool Stats Model"""
+    name: str
+    pool_class: str
+    size: Optional[int]
+    checked_out: Optional[int]
+    checked_in: Optional[int]
+    overflow: Optional[int]
+    connects: int
+    checkouts: int
+    checkins: int
+    invalidations: int
+    timeouts: int
+    wait_ms: Histogram
@@ -13,6 +13,14 @@ class OperationKind(str, Enum):# pylint: disable=too-few-public-methods
     OUTCOME = 'outcome'
 
 
+class OperationSort(str, Enum):# pylint: disable=too-few-public-methods
+    """Operation Sort Model"""
+    DATE_DESC = 'date_desc'
+    DATE_ASC = 'date_asc'
+    AMOUNT_DESC = 'amount_desc'
+    AMOUNT_ASC = 'amount_asc'
+
+
 class BaseOperation(BaseModel):# pylint: disable=too-few-public-methods
     """Base Operation Model"""
     date: date
@@ -36,3 +44,61 @@ class Operation(BaseOperation):# pylint: disable=too-few-public-methods
     class Config:# pylint: disable=too-few-public-methods
         """orm mode on"""
         orm_mode = True
+
+
+class OperationFilter(BaseModel):# pylint: disable=too-few-public-methods
+    """Operation Filter Model, every field is a query parameter of the list"""
+    kind: Optional[OperationKind] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    amount_min: Optional[Decimal] = None
+    amount_max: Optional[Decimal] = None
+    description_contains: Optional[str] = None
+    description_prefix: Optional[str] = None
+    sort: OperationSort = OperationSort.DATE_DESC
+    include_archived: bool = False
+
+
+class OperationsPage(BaseModel):# pylint: disable=too-few-public-methods
+    """Operations Page Model"""
+    items: list[Operation]
+    next_cursor: Optional[str]
+
+
+class OperationChanges(BaseModel):# pylint: disable=too-few-public-methods
+    """Operation Changes Model"""
+    upserts: list[Operation]
+    deletes: list[int]
+    next_cursor: str
+    has_more: bool
+
+
+class OperationBatchUpdate(OperationUpdate):# pylint: disable=too-few-public-methods
+    """Operation Update In Batch Model"""
+    id: int
+
+
+class OperationBatch(BaseModel):# pylint: disable=too-few-public-methods
+    """Operation Batch Model"""
+    create: list[OperationCreate] = []
+    update: list[OperationBatchUpdate] = []
+    delete: list[int] = []
+
+
+class BatchItemStatus(str, Enum):# pylint: disable=too-few-public-methods
+    """Batch Item Status Model"""
+    OK = 'ok'
+    NOT_FOUND = 'not_found'
+
+
+class BatchItemResult(BaseModel):# pylint: disable=too-few-public-methods
+    """Batch Item Result Model"""
+    id: int
+    status: BatchItemStatus
+
+
+class OperationBatchResult(BaseModel):# pylint: disable=too-few-public-methods
+    """Operation Batch Result Model"""
+    created: list[Operation]
+    updated: list[BatchItemResult]
+    deleted: list[BatchItemResult]
@@ -0,0 +1,84 @@
+"""Models for reports"""
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel# pylint: disable=no-name-in-module
+
+
+class ImportJobStatus(str, Enum):# pylint: disable=too-few-public-methods
+    """Import Job Status Model"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class ImportJob(BaseModel):# pylint: disable=too-few-public-methods
+    """Import Job Model"""
+    id: str
+    user_id: int
+    status: ImportJobStatus = ImportJobStatus.PENDING
+    rows_processed: int = 0
+    rows_imported: int = 0
+    rows_rejected: int = 0
+    rejected_lines: list[int] = []
+    rows_per_second: float = 0
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+
+class SummaryPeriod(str, Enum):# pylint: disable=too-few-public-methods
+    """Summary Period Model"""
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+
+
+class Balance(BaseModel):# pylint: disable=too-few-public-methods
+    """Balance Model"""
+    income: Decimal
+    outcome: Decimal
+    balance: Decimal
+
+
+class BalanceBucket(Balance):# pylint: disable=too-few-public-methods
+    """Balance Of One Period Model"""
+    period_start: date
+
+
+class KindStats(BaseModel):# pylint: disable=too-few-public-methods
+    """Amount Statistics Of One Kind Model"""
+    total: Decimal
+    count: int
+    share: float
+    average: float
+    median: float
+    p90: float
+    p99: float
+    monthly_average: float
+
+
+class MonthStats(Balance):# pylint: disable=too-few-public-methods
+    """Totals Of One Month Model"""
+    month: date
+    income_count: int
+    outcome_count: int
+
+
+class BalancePoint(BaseModel):# pylint: disable=too-few-public-methods
+    """Running Balance At The End Of A Day Model"""
+    date: date
+    balance: Decimal
+
+
+class Analytics(BaseModel):# pylint: disable=too-few-public-methods
+    """Analytics Model"""
+    opening_balance: Decimal
+    income: KindStats
+    outcome: KindStats
+    months: list[MonthStats]
+    running_balance: list[BalancePoint]
@@ -0,0 +1,92 @@
+"""Connection pool with checkout metrics"""
+import time
+from threading import Lock
+from typing import Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .metrics import Histogram
+
+
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+COUNTERS = ('connects', 'checkouts', 'checkins', 'invalidations', 'timeouts')
+
+
+class PoolMetrics:
+    """Counters of engine pool fed by pool events and TimedPoolMixin"""
+    def __init__(self, name: str, engine: Engine) -> None:
+        self.name = name
+        self.engine = engine
+        self.wait_ms = Histogram(WAIT_BUCKETS_MS)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.lock = Lock()
+
+    def count(self, counter: str):
+        """Increase counter by one"""
+        with self.lock:
+            self.counters[counter] += 1
+
+    def attach(self):
+        """Listen to pool events, they survive engine.dispose()"""
+        pool = self.engine.pool
+        event.listen(pool, 'connect', lambda *_: self.count('connects'))
+        event.listen(pool, 'checkout', lambda *_: self.count('checkouts'))
+        event.listen(pool, 'checkin', lambda *_: self.count('checkins'))
+        event.listen(pool, 'invalidate', lambda *_: self.count('invalidations'))
+        if isinstance(pool, TimedPoolMixin):
+            pool.metrics = self
+
+    def snapshot(self) -> dict:
+        """Current pool state and counters"""
+        pool = self.engine.pool
+
+        def state(method: str) -> Optional[int]:
+            return getattr(pool, method)() if hasattr(pool, method) else None
+
+        return {
+            'name': self.name,
+            'pool_class': type(pool).__name__,
+            'size': state('size'),
+            'checked_out': state('checkedout'),
+            'checked_in': state('checkedin'),
+            'overflow': state('overflow'),
+            **self.counters,
+            'wait_ms': self.wait_ms.snapshot(),
+        }
+
+
+class TimedPoolMixin:# pylint: disable=too-few-public-methods
+    """Measure time spent waiting for a connection
+
+    Pool events fire only after a connection is handed out, so the wait is
+    timed around _do_get, which blocks until one is free or pool_timeout.
+    """
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics:
+                self.metrics.count('timeouts')
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.wait_ms.observe((time.perf_counter() - started) * 1000)
+
+    def recreate(self):
+        """Keep metrics when engine is disposed"""
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """QueuePool with checkout wait metrics"""
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout wait metrics"""
@@ -0,0 +1,22 @@
+"""Recount daily totals: python -m app.rebuild_rollup [--user-id ID]"""
+import argparse
+
+from .database import Session
+from .services.rollup import rebuild_rollup
+
+
+def main():
+    """Backfill or repair operation_daily_totals"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--user-id', type=int, help='only this user')
+    args = parser.parse_args()
+
+    session = Session()
+    try:
+        rebuild_rollup(session, args.user_id)
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Fast JSON responses from plain rows"""
+import json
+from datetime import date
+from typing import Any, Iterable
+
+from fastapi.responses import JSONResponse
+from pydantic.json import decimal_encoder# pylint: disable=no-name-in-module
+
+try:
+    import orjson
+except ImportError:# pragma: no cover
+    orjson = None
+
+
+def encode_default(value: Any) -> Any:
+    """Types the stdlib encoder does not know, orjson encodes dates natively"""
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(content: Any) -> bytes:
+    """Same bytes as JSONResponse, with orjson when installed
+
+    Only for dicts, lists, str, int, float within 1e16, None and dates:
+    beyond that orjson and json format floats differently.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)# pylint: disable=no-member
+
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(',', ':'),
+        default=encode_default,
+    ).encode('utf-8')
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON made by dumps, with orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(data)# pylint: disable=no-member
+    return json.loads(data)
+
+
+def encode_rows(
+        fields: tuple[str, ...],
+        rows: Iterable[tuple],
+        decimals: tuple[str, ...] = ()) -> list[dict]:
+    """Rows as dicts ready for dumps
+
+    Decimals are converted like jsonable_encoder does it, to int or float.
+    """
+    items = [dict(zip(fields, row)) for row in rows]
+    for item in items:
+        for field in decimals:
+            if item[field] is not None:
+                item[field] = decimal_encoder(item[field])
+    return items
+
+
+class RawJSONResponse(JSONResponse):
+    """JSONResponse of already encodable content, skips jsonable_encoder
+
+    Return it from a view to bypass response_model validation, the model
+    is still used for the OpenAPI schema.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
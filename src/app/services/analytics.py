@@ -0,0 +1,309 @@
+"""Statistics of operations computed on NumPy columns"""
+from collections import Counter, OrderedDict
+from datetime import date, timedelta
+from itertools import chain
+from threading import Lock
+from typing import Optional, Union
+
+import numpy
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    case,
+    cast,
+    func,
+    literal,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.operations import OperationKind
+from ..settings import settings
+from ..tables import Operation as table_operation
+from .archive import ArchiveService, chunk_columns
+from .base import AsyncService
+from .read_routing import get_api_read_session
+
+
+EPOCH = date(1970, 1, 1)
+PERCENTILES = (50, 90, 99)
+
+
+def epoch_days(column, dialect_name: str):
+    """SQL expression of days from 1970-01-01 to column date"""
+    if dialect_name == 'postgresql':
+        return cast(column - literal(EPOCH), Integer)
+    return cast(func.julianday(column) - 2440587.5, Integer)
+
+
+def to_date(days: int) -> date:
+    """Date of days from 1970-01-01"""
+    return EPOCH + timedelta(days=days)
+
+
+def to_amount(cents: float) -> float:
+    """Amount of cents for the response"""
+    return round(float(cents) / 100, 2)
+
+
+class OperationColumns:
+    """Date, kind and amount of all operations of a user, ordered by date
+
+    days counts from 1970-01-01, income is True for income and amounts
+    are cents, about 13 bytes per operation.
+    """
+    __slots__ = ('days', 'income', 'cents')
+
+    def __init__(self, days: numpy.ndarray, income: numpy.ndarray, cents: numpy.ndarray) -> None:
+        order = numpy.argsort(days, kind='stable')
+        self.days = days[order].astype(numpy.int32)
+        self.income = income[order].astype(bool)
+        self.cents = cents[order].astype(numpy.int64)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the arrays"""
+        return self.days.nbytes + self.income.nbytes + self.cents.nbytes
+
+    def bounds(self, date_from: Optional[date], date_to: Optional[date]) -> tuple[int, int]:
+        """Slice of operations dated from date_from through date_to"""
+        start = 0
+        end = len(self.days)
+        if date_from:
+            start = int(numpy.searchsorted(self.days, (date_from - EPOCH).days, 'left'))
+        if date_to:
+            end = int(numpy.searchsorted(self.days, (date_to - EPOCH).days, 'right'))
+        return start, max(start, end)
+
+
+class ColumnsCache:
+    """LRU of OperationColumns per user limited by total array size
+
+    An entry is read at one data version of its user, any later write
+    makes it stale.
+    """
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[int, tuple[int, OperationColumns]] = OrderedDict()
+        self.size = 0
+        self.counts = Counter(hits=0, misses=0)
+        self.lock = Lock()
+
+    def get(self, user_id: int, version: int) -> Optional[OperationColumns]:
+        """Columns of user read at version"""
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry[0] != version:
+                self.counts['misses'] += 1
+                return None
+            self.entries.move_to_end(user_id)
+            self.counts['hits'] += 1
+            return entry[1]
+
+    def set(self, user_id: int, version: int, columns: OperationColumns):
+        """Store columns, evict least recently used ones above max_bytes"""
+        if columns.nbytes > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(user_id, None)
+            if old is not None:
+                if old[0] > version:
+                    self.entries[user_id] = old
+                    return
+                self.size -= old[1].nbytes
+            self.entries[user_id] = (version, columns)
+            self.size += columns.nbytes
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted.nbytes
+
+    def stats(self) -> dict:
+        """Counters for diagnostics"""
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.size, **self.counts}
+
+
+def kind_stats(
+        cents: numpy.ndarray,
+        month_totals: numpy.ndarray,
+        turnover: int) -> dict:
+    """Total, share of turnover, average and percentiles of amounts of one kind"""
+    total = int(cents.sum())
+    percentiles = (
+        numpy.percentile(cents, PERCENTILES)
+        if len(cents) else
+        numpy.zeros(len(PERCENTILES))
+    )
+    return {
+        'total': to_amount(total),
+        'count': len(cents),
+        'share': round(total / turnover, 4) if turnover else 0.0,
+        'average': to_amount(cents.mean()) if len(cents) else 0.0,
+        'median': to_amount(percentiles[0]),
+        'p90': to_amount(percentiles[1]),
+        'p99': to_amount(percentiles[2]),
+        'monthly_average': to_amount(month_totals.mean()) if len(month_totals) else 0.0,
+    }
+
+
+def month_stats(days: numpy.ndarray, income: numpy.ndarray, cents: numpy.ndarray) -> tuple:
+    """Months from first to last month of days, with income and outcome totals and counts"""
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(numpy.int64)
+    first_month = int(months[0]) if len(months) else 0
+    month_count = int(months[-1]) - first_month + 1 if len(months) else 0
+    month_index = months - first_month
+
+    def totals(weights: numpy.ndarray) -> numpy.ndarray:
+        return numpy.bincount(
+            month_index, weights=weights, minlength=month_count,
+        ).round().astype(numpy.int64)
+
+    return (
+        range(first_month, first_month + month_count),
+        totals(numpy.where(income, cents, 0)),
+        totals(numpy.where(income, 0, cents)),
+        numpy.bincount(month_index[income], minlength=month_count),
+        numpy.bincount(month_index[~income], minlength=month_count),
+    )
+
+
+def running_balance(days: numpy.ndarray, signed: numpy.ndarray, opening: int) -> list[dict]:
+    """Balance at the end of every day with operations"""
+    # days are sorted, each day starts where the value changes
+    day_starts = numpy.flatnonzero(numpy.diff(days, prepend=days[:1] - 1))
+    if not day_starts.size:
+        return []
+    balances = opening + numpy.cumsum(numpy.add.reduceat(signed, day_starts))
+    return [
+        {'date': to_date(day), 'balance': to_amount(balance)}
+        for day, balance in zip(days[day_starts].tolist(), balances.tolist())
+    ]
+
+
+def compute_analytics(
+        columns: OperationColumns,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None) -> dict:
+    """Analytics of operations dated from date_from through date_to
+
+    Months run from the first to the last month with operations, months
+    without any count as zero in the monthly averages. The running
+    balance starts at the balance of all operations before date_from.
+    """
+    selected = slice(*columns.bounds(date_from, date_to))
+    signed = numpy.where(columns.income, columns.cents, -columns.cents)
+    opening = int(signed[:selected.start].sum())
+    days = columns.days[selected]
+    income = columns.income[selected]
+    cents = columns.cents[selected]
+
+    months, income_months, outcome_months, income_counts, outcome_counts = month_stats(
+        days, income, cents,
+    )
+    turnover = int(cents.sum())
+    return {
+        'opening_balance': to_amount(opening),
+        'income': kind_stats(cents[income], income_months, turnover),
+        'outcome': kind_stats(cents[~income], outcome_months, turnover),
+        'months': [
+            {
+                'month': date(1970 + month // 12, month % 12 + 1, 1),
+                'income': to_amount(month_income),
+                'outcome': to_amount(month_outcome),
+                'balance': to_amount(month_income - month_outcome),
+                'income_count': income_count,
+                'outcome_count': outcome_count,
+            }
+            for month, month_income, month_outcome, income_count, outcome_count in zip(
+                months,
+                income_months.tolist(),
+                outcome_months.tolist(),
+                income_counts.tolist(),
+                outcome_counts.tolist(),
+            )
+        ],
+        'running_balance': running_balance(days, signed[selected], opening),
+    }
+
+
+class AnalyticsService:# pylint: disable=too-few-public-methods
+    """Analytics Service"""
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def _hot_columns(self, user_id: int) -> numpy.ndarray:
+        """(days, income, cents) rows of operations table, converted by the database"""
+        dialect_name = self.session.get_bind().dialect.name
+        statement = (
+            select(
+                epoch_days(table_operation.date, dialect_name),
+                case((table_operation.kind == OperationKind.INCOME.value, 1), else_=0),
+                cast(func.round(func.coalesce(table_operation.amount, 0) * 100), BigInteger),
+            )
+            .where(table_operation.user_id == user_id)
+        )
+        batch_size = settings.analytics_batch_size
+        # Core connection, the ORM would build its result rows one by one
+        result = self.session.connection().execute(
+            statement.execution_options(
+                stream_results=True,
+                max_row_buffer=batch_size,
+            ),
+        )
+        parts = [
+            numpy.fromiter(chain.from_iterable(rows), dtype=numpy.int64, count=3 * len(rows))
+            for rows in result.partitions(batch_size)
+        ]
+        if not parts:
+            return numpy.empty((0, 3), dtype=numpy.int64)
+        return numpy.concatenate(parts).reshape(-1, 3)
+
+    def _archived_columns(self, user_id: int) -> numpy.ndarray:
+        """(days, income, cents) rows of archived operations, from the stored columns"""
+        parts = []
+        for chunk in ArchiveService(self.session).get_chunks(user_id):
+            columns = chunk_columns(chunk.data)
+            kinds = numpy.array(columns['kinds'], dtype=object)
+            amounts = numpy.array(columns['amount'], dtype=float)
+            parts.append(numpy.column_stack((
+                numpy.cumsum(columns['date'], dtype=numpy.int64) - EPOCH.toordinal(),
+                kinds[columns['kind']] == OperationKind.INCOME.value,
+                numpy.nan_to_num(amounts).astype(numpy.int64),
+            )))
+        if not parts:
+            return numpy.empty((0, 3), dtype=numpy.int64)
+        return numpy.concatenate(parts)
+
+    def get_columns(self, user_id: int) -> OperationColumns:
+        """Columns of hot and archived operations of user, no ORM objects"""
+        rows = numpy.concatenate((self._hot_columns(user_id), self._archived_columns(user_id)))
+        return OperationColumns(rows[:, 0], rows[:, 1], rows[:, 2])
+
+
+class AsyncAnalyticsReader(AsyncService):
+    """Analytics Service for read-only async views, on a read replica"""
+    def __init__(
+        self,
+        session: Union[Session, AsyncSession] = Depends(get_api_read_session)) -> None:
+        super().__init__(session)
+
+    async def get_analytics(
+        self,
+        user_id: int,
+        version: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None) -> dict:
+        """Analytics of user, computed in the threadpool in both database modes"""
+        columns = columns_cache.get(user_id, version)
+        if columns is None:
+            columns = await self.run(
+                lambda session: AnalyticsService(session).get_columns(user_id)
+            )
+            columns_cache.set(user_id, version, columns)
+        return await run_in_threadpool(compute_analytics, columns, date_from, date_to)
+
+
+columns_cache = ColumnsCache(settings.analytics_cache_bytes)
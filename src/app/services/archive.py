@@ -0,0 +1,274 @@
+"""Archive of old operations, compressed column by column"""
+import heapq
+import zlib
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+from itertools import accumulate, chain, groupby, islice
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import (
+    delete,
+    func,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session
+
+from ..models.operations import Operation, OperationFilter
+from ..serialization import dumps, loads
+from ..tables import (
+    Operation as table_operation,
+    OperationArchive as table_archive,
+    User as table_user,
+)
+from .partitions import add_months, month_start
+from .response_cache import data_versions
+
+
+CHUNK_FORMAT = 1
+
+archive_fields = (*Operation.__fields__, 'change_seq')
+ArchivedOperation = namedtuple('ArchivedOperation', archive_fields)
+
+
+def deltas(values: list[int]) -> list[int]:
+    """Differences to the previous value, the first one as it is"""
+    return [value - previous for previous, value in zip([0, *values], values)]
+
+
+def encode_chunk(rows: list) -> bytes:
+    """Rows of one month ordered by date and id, compressed column by column
+
+    ids and dates are kept as differences to the previous row, kinds as
+    indexes into their list and amounts as cents, which leaves zlib runs
+    of small repeated numbers.
+    """
+    kinds = sorted({row.kind for row in rows})
+    codes = {kind: code for code, kind in enumerate(kinds)}
+    return zlib.compress(dumps({
+        'format': CHUNK_FORMAT,
+        'id': deltas([row.id for row in rows]),
+        'date': deltas([row.date.toordinal() for row in rows]),
+        'kinds': kinds,
+        'kind': [codes[row.kind] for row in rows],
+        'amount': [None if row.amount is None else int(row.amount.scaleb(2)) for row in rows],
+        'description': [row.description for row in rows],
+        'change_seq': [row.change_seq for row in rows],
+    }))
+
+
+def chunk_columns(data: bytes) -> dict:
+    """Columns of chunk made by encode_chunk, still encoded"""
+    columns = loads(zlib.decompress(data))
+    if columns['format'] != CHUNK_FORMAT:
+        raise ValueError(f'Unknown archive chunk format {columns["format"]}')
+    return columns
+
+
+def decode_chunk(data: bytes) -> list[ArchivedOperation]:
+    """Rows of chunk made by encode_chunk"""
+    columns = chunk_columns(data)
+    kinds = columns['kinds']
+    return [
+        ArchivedOperation(
+            date=date.fromordinal(ordinal),
+            kind=kinds[code],
+            amount=None if cents is None else Decimal(cents).scaleb(-2),
+            description=description,
+            id=operation_id,
+            change_seq=change_seq,
+        )
+        for operation_id, ordinal, code, cents, description, change_seq in zip(
+            accumulate(columns['id']),
+            accumulate(columns['date']),
+            columns['kind'],
+            columns['amount'],
+            columns['description'],
+            columns['change_seq'],
+        )
+    ]
+
+
+def matches(row: ArchivedOperation, filters: OperationFilter) -> bool:
+    """Archived row passes list filters, descriptions compared case-insensitively"""
+    description = row.description.lower() if row.description is not None else None
+    conditions = []
+    if filters.kind:
+        conditions.append(row.kind == filters.kind)
+    if filters.date_from:
+        conditions.append(row.date >= filters.date_from)
+    if filters.date_to:
+        conditions.append(row.date <= filters.date_to)
+    if filters.amount_min is not None:
+        conditions.append(row.amount >= filters.amount_min)
+    if filters.amount_max is not None:
+        conditions.append(row.amount <= filters.amount_max)
+    if filters.description_contains:
+        conditions.append(
+            description is not None
+            and filters.description_contains.lower() in description
+        )
+    if filters.description_prefix:
+        conditions.append(
+            description is not None
+            and description.startswith(filters.description_prefix.lower())
+        )
+    return all(conditions)
+
+
+def newest_first(row) -> tuple:
+    """Sort key of the export order, newest first with reverse=True"""
+    return row.date, row.id
+
+
+class ArchivedRows:
+    """Archived rows of a user newest first, merged into batches of hot rows
+
+    Hot operations may be older than archived ones, a backdated create
+    lands in the hot table. Chunks are decompressed one month at a time
+    as the merge reaches them.
+    """
+    def __init__(self, chunks: Iterable) -> None:
+        self.rows = self._decode(chunks)
+        self.head = next(self.rows, None)
+
+    @staticmethod
+    def _decode(chunks: Iterable) -> Iterator[ArchivedOperation]:
+        """Rows of (date_from, data) chunks newest first"""
+        chunks = sorted(chunks, key=lambda chunk: chunk.date_from, reverse=True)
+        for _, month in groupby(chunks, key=lambda chunk: month_start(chunk.date_from)):
+            rows = [row for chunk in month for row in decode_chunk(chunk.data)]
+            rows.sort(key=newest_first, reverse=True)
+            yield from rows
+
+    def merge(self, batch: list) -> list:
+        """Batch of hot rows, newest first, with the archived rows due before its end"""
+        if not batch or self.head is None:
+            return batch
+
+        last = newest_first(batch[-1])
+        taken = []
+        while self.head is not None and newest_first(self.head) > last:
+            taken.append(self.head)
+            self.head = next(self.rows, None)
+        if not taken:
+            return batch
+        return list(heapq.merge(batch, taken, key=newest_first, reverse=True))
+
+    def rest(self, size: int) -> Iterator[list]:
+        """Archived rows older than every hot row, in lists of at most size"""
+        if self.head is not None:
+            self.rows = chain([self.head], self.rows)
+            self.head = None
+        while batch := list(islice(self.rows, size)):
+            yield batch
+
+
+class ArchiveService:
+    """Archive Service
+
+    Archived operations are read-only, they are listed on request and
+    exported, but not found by id, updated, deleted or delta synced.
+    Archiving leaves no tombstones, synced clients keep their copy.
+    """
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    @staticmethod
+    def select_chunks(
+        user_id: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None):
+        """statement of chunks of user holding rows of the date range"""
+        statement = (
+            select(table_archive.date_from, table_archive.data)
+            .where(table_archive.user_id == user_id)
+        )
+        if date_from:
+            statement = statement.where(table_archive.date_to >= date_from)
+        if date_to:
+            statement = statement.where(table_archive.date_from <= date_to)
+        return statement
+
+    def get_chunks(self, user_id: int, **kwargs) -> list:
+        """chunks of user holding rows of the date range"""
+        return self.session.execute(self.select_chunks(user_id, **kwargs)).all()
+
+    def get_rows(self, user_id: int, **kwargs) -> list[ArchivedOperation]:
+        """archived rows of chunks holding rows of the date range, unordered"""
+        return [
+            row
+            for chunk in self.get_chunks(user_id, **kwargs)
+            for row in decode_chunk(chunk.data)
+        ]
+
+    def _lock_user(self, user_id: int):
+        """Wait for writers of user and keep new ones waiting until commit
+
+        Writers take the same lock reserving change numbers.
+        """
+        table = table_user.__table__
+        self.session.execute(
+            update(table)
+            .where(table.c.id == user_id)
+            .values(change_seq=table.c.change_seq)
+        )
+
+    def _archive_range(self, user_id: int, start: date, end: date) -> int:
+        """Move operations of user from start until end into one chunk"""
+        self._lock_user(user_id)
+        in_range = (
+            table_operation.user_id == user_id,
+            table_operation.date >= start,
+            table_operation.date < end,
+        )
+        rows = self.session.execute(
+            select(*(getattr(table_operation, field) for field in archive_fields))
+            .where(*in_range)
+            .order_by(table_operation.date, table_operation.id)
+        ).all()
+        if rows:
+            self.session.execute(insert(table_archive).values(
+                user_id=user_id,
+                date_from=rows[0].date,
+                date_to=rows[-1].date,
+                row_count=len(rows),
+                data=encode_chunk(rows),
+            ))
+            self.session.execute(delete(table_operation.__table__).where(*in_range))
+        self.session.commit()
+        return len(rows)
+
+    def archive_user(self, user_id: int, before: date) -> int:
+        """Move operations of user dated before before, one month per transaction
+
+        Daily totals keep counting archived operations.
+        """
+        first = self.session.scalar(
+            select(func.min(table_operation.date))
+            .where(
+                table_operation.user_id == user_id,
+                table_operation.date < before,
+            )
+        )
+        self.session.commit()
+        if first is None:
+            return 0
+
+        archived = 0
+        month = month_start(first)
+        while month < before:
+            archived += self._archive_range(user_id, month, min(add_months(month, 1), before))
+            month = add_months(month, 1)
+        data_versions.bump(user_id)
+        return archived
+
+    def archive(self, before: date, user_id: Optional[int] = None) -> int:
+        """Archive operations dated before before of user, of every user without one"""
+        if user_id is not None:
+            return self.archive_user(user_id, before)
+
+        user_ids = self.session.scalars(select(table_user.id).order_by(table_user.id)).all()
+        return sum(self.archive_user(each, before) for each in user_ids)
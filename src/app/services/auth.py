@@ -3,6 +3,7 @@ from datetime import (
     datetime,
     timedelta,
 )
+from typing import Optional
 from fastapi import (
     Depends,
     HTTPException,
@@ -10,13 +11,15 @@ from fastapi import (
 )
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from passlib.hash import bcrypt
 from sqlalchemy.orm import Session
 from pydantic import ValidationError
 from ..settings import settings
 from ..database import get_session
 from ..tables import User as table_user
 from ..models.auth import User, Token, UserCreate
+from .base import AsyncService
+from .hashing import password_hasher
+from .token_cache import token_cache
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/auth/sign-in')
@@ -32,16 +35,20 @@ class AuthService:
     @classmethod
     def verify_password(cls, plain_password: str, hashed_password: str) -> bool:
         """Verify password"""
-        return bcrypt.verify(plain_password, hashed_password)
+        return password_hasher.verify(plain_password, hashed_password)
 
     @classmethod
     def hash_password(cls, password: str) -> str:
         """Get password hash"""
-        return bcrypt.hash(password)
+        return password_hasher.hash(password)
 
     @classmethod
     def verify_token(cls, token: str) -> User:
-        """Validate token"""
+        """Validate token, verified tokens are cached until expiration"""
+        user = token_cache.get(token)
+        if user:
+            return user
+
         exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Could not validate credentials',
@@ -64,6 +71,7 @@ class AuthService:
         except ValidationError:
             raise exception from None
 
+        token_cache.set(token, user, payload['exp'])
         return user
 
     @classmethod
@@ -91,36 +99,83 @@ class AuthService:
     def __init__(self, session: Session = Depends(get_session)) -> None:
         self.session = session
 
-    def register_new_user(self, user_data: UserCreate) -> Token:
-        """Register new user"""
+    @staticmethod
+    def incorrect_credentials() -> HTTPException:
+        """Error of sign in"""
+        return HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Incorrect username or password',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+
+    def add_user(self, user_data: UserCreate, password_hash: str) -> Token:
+        """Save user with ready password hash"""
         user = table_user(
             email=user_data.email,
             username=user_data.username,
-            password_hash=self.hash_password(user_data.password),
+            password_hash=password_hash,
         )
         self.session.add(user)
         self.session.commit()
         return self.create_token(user)
 
-    def authenticate_user(self, username: str, password: str) -> Token:
-        """Authenticate user"""
-        exception = HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail='Incorrect username or password',
-            headers={'WWW-Authenticate': 'Bearer'},
-        )
-
-        user = (
+    def find_user(self, username: str) -> Optional[table_user]:
+        """Get user by username"""
+        return (
             self.session
             .query(table_user)
             .filter(table_user.username == username)
             .first()
         )
 
+    def set_password_hash(self, user: table_user, password_hash: str):
+        """Replace password hash"""
+        user.password_hash = password_hash
+        self.session.commit()
+
+    def register_new_user(self, user_data: UserCreate) -> Token:
+        """Register new user"""
+        return self.add_user(user_data, self.hash_password(user_data.password))
+
+    def authenticate_user(self, username: str, password: str) -> Token:
+        """Authenticate user"""
+        user = self.find_user(username)
+
         if not user:
-            raise exception
+            raise self.incorrect_credentials()
 
         if not self.verify_password(password, user.password_hash):
-            raise exception
+            raise self.incorrect_credentials()
+
+        if password_hasher.needs_update(user.password_hash):
+            self.set_password_hash(user, self.hash_password(password))
 
         return self.create_token(user)
+
+
+class AsyncAuthService(AsyncService):
+    """Autorization user from async views, bcrypt is awaited"""
+    async def register_new_user(self, user_data: UserCreate) -> Token:
+        """Register new user"""
+        password_hash = await password_hasher.hash_async(user_data.password)
+        return await self.run(
+            lambda session: AuthService(session).add_user(user_data, password_hash)
+        )
+
+    async def authenticate_user(self, username: str, password: str) -> Token:
+        """Authenticate user"""
+        user = await self.run(lambda session: AuthService(session).find_user(username))
+
+        if not user:
+            raise AuthService.incorrect_credentials()
+
+        if not await password_hasher.verify_async(password, user.password_hash):
+            raise AuthService.incorrect_credentials()
+
+        if password_hasher.needs_update(user.password_hash):
+            password_hash = await password_hasher.hash_async(password)
+            await self.run(
+                lambda session: AuthService(session).set_password_hash(user, password_hash)
+            )
+
+        return AuthService.create_token(user)
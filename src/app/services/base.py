@@ -0,0 +1,31 @@
+"""Base of services used by async views"""
+from typing import Callable, TypeVar, Union
+
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..database import get_api_session
+
+
+Result = TypeVar('Result')
+
+
+class AsyncService:# pylint: disable=too-few-public-methods
+    """Run sync service code with the session of the configured mode
+
+    With async_database the code runs through AsyncSession.run_sync, so its
+    database IO is awaited on the event loop. Otherwise it runs in the
+    threadpool, the same way as a sync view.
+    """
+    def __init__(
+        self,
+        session: Union[Session, AsyncSession] = Depends(get_api_session)) -> None:
+        self.session = session
+
+    async def run(self, func: Callable[..., Result], *args, **kwargs) -> Result:
+        """Call func(sync_session, *args, **kwargs)"""
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(func, *args, **kwargs)
+        return await run_in_threadpool(func, self.session, *args, **kwargs)
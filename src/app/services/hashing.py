@@ -0,0 +1,109 @@
+"""Password hashing off the request threads"""
+import asyncio
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Optional
+
+from fastapi import (
+    HTTPException,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from passlib.hash import bcrypt
+
+from ..settings import settings
+
+
+def hash_password(password: str, rounds: int) -> str:
+    """Get password hash, runs in worker process"""
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify password, runs in worker process"""
+    return bcrypt.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Run bcrypt in a process pool with limited queue
+
+    At most workers + queue_size calls are in flight, the next one gets 503
+    right away instead of waiting for a free worker.
+    """
+    def __init__(self, workers: int, queue_size: int, rounds: int) -> None:
+        self.workers = workers
+        self.rounds = rounds
+        self.slots = BoundedSemaphore(workers + queue_size)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.lock = Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Start worker processes on first use"""
+        with self.lock:
+            if not self.pool:
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+        return self.pool
+
+    def _submit(self, func, *args) -> Future:
+        """Queue func in pool, slot is freed when it is done"""
+        if not self.slots.acquire(blocking=False):# pylint: disable=consider-using-with
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Too many authentication requests',
+                headers={'Retry-After': '1'},
+            )
+        try:
+            future = self._get_pool().submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def _run(self, func, *args):
+        """Run func in pool and wait for result"""
+        if not self.workers:
+            return func(*args)
+        return self._submit(func, *args).result()
+
+    async def _run_async(self, func, *args):
+        """Run func in pool and await result"""
+        if not self.workers:
+            return await run_in_threadpool(func, *args)
+        return await asyncio.wrap_future(self._submit(func, *args))
+
+    def hash(self, password: str) -> str:
+        """Get password hash with current cost"""
+        return self._run(hash_password, password, self.rounds)
+
+    async def hash_async(self, password: str) -> str:
+        """Get password hash with current cost, async"""
+        return await self._run_async(hash_password, password, self.rounds)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify password"""
+        return self._run(verify_password, plain_password, hashed_password)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify password, async"""
+        return await self._run_async(verify_password, plain_password, hashed_password)
+
+    def needs_update(self, hashed_password: str) -> bool:
+        """Hash was made with other cost"""
+        return bcrypt.using(rounds=self.rounds).needs_update(hashed_password)
+
+    def shutdown(self):
+        """Stop worker processes"""
+        if self.pool:
+            self.pool.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.hashing_workers,
+    queue_size=settings.hashing_queue_size,
+    rounds=settings.bcrypt_rounds,
+)
@@ -0,0 +1,171 @@
+"""Background import jobs"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from typing import BinaryIO, Optional
+from uuid import uuid4
+
+from fastapi import (
+    HTTPException,
+    status,
+)
+
+from ..settings import settings
+from ..database import Session
+from ..models.reports import ImportJob, ImportJobStatus
+from .operations import OperationService
+from .reports import ReportsService
+
+
+class ImportJobManager:
+    """Spool uploads to disk and import them on a bounded worker pool"""
+    active_statuses = (ImportJobStatus.PENDING, ImportJobStatus.RUNNING)
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        keep: int,
+        processes: int) -> None:
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='import',
+        )
+        self.processes = processes
+        self.process_pool: Optional[ProcessPoolExecutor] = None
+        self.max_pending = max_pending
+        self.keep = keep
+        self.jobs: OrderedDict[str, ImportJob] = OrderedDict()
+        self.lock = Lock()
+
+    def _evict(self):
+        """Forget oldest finished jobs above the keep limit"""
+        finished = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.status not in self.active_statuses
+        ]
+        for job_id in finished[:max(len(self.jobs) - self.keep, 0)]:
+            del self.jobs[job_id]
+
+    @staticmethod
+    def _spool(file: BinaryIO) -> str:
+        """Copy upload to a temporary file which outlives the request"""
+        with tempfile.NamedTemporaryFile(
+            dir=settings.import_spool_dir,
+            prefix='import-',
+            suffix='.csv',
+            delete=False,
+        ) as spool:
+            shutil.copyfileobj(file, spool)
+        return spool.name
+
+    def submit(self, user_id: int, file: BinaryIO) -> ImportJob:
+        """Register job and queue it"""
+        with self.lock:
+            active = sum(
+                job.status in self.active_statuses
+                for job in self.jobs.values()
+            )
+            if active >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail='Too many imports in progress',
+                )
+            job = ImportJob(
+                id=uuid4().hex,
+                user_id=user_id,
+                created_at=datetime.utcnow(),
+            )
+            self.jobs[job.id] = job
+            self._evict()
+
+        try:
+            path = self._spool(file)
+        except OSError as error:
+            job.status = ImportJobStatus.FAILED
+            job.error = str(error)
+            raise
+
+        self.executor.submit(self._run, job, path)
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        """Get job by id"""
+        return self.jobs.get(job_id)
+
+    def _get_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Parsing processes shared by all jobs, None when disabled"""
+        if self.processes < 2:
+            return None
+        with self.lock:
+            if not self.process_pool:
+                self.process_pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+        return self.process_pool
+
+    def _run(self, job: ImportJob, path: str):
+        """Import spooled file and record progress on job"""
+        job.status = ImportJobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+        started = time.monotonic()
+
+        def progress(imported: int, rejected: list[int]):
+            keep = settings.import_rejected_lines_keep - len(job.rejected_lines)
+            job.rejected_lines.extend(rejected[:max(keep, 0)])
+            job.rows_imported = imported
+            job.rows_rejected += len(rejected)
+            job.rows_processed = imported + job.rows_rejected
+            job.rows_per_second = round(
+                job.rows_processed / max(time.monotonic() - started, 1e-6),
+                1,
+            )
+
+        session = Session()
+        reports_service = ReportsService(OperationService(session))
+        try:
+            process_pool = None
+            if os.path.getsize(path) >= settings.import_parallel_min_bytes:
+                process_pool = self._get_process_pool()
+
+            if process_pool:
+                reports_service.import_csv_parallel(
+                    job.user_id,
+                    path,
+                    process_pool,
+                    self.processes * 2,
+                    progress,
+                )
+            else:
+                with open(path, 'rb') as file:
+                    reports_service.import_csv(job.user_id, file, progress)
+            job.status = ImportJobStatus.DONE
+        except Exception as error:# pylint: disable=broad-except
+            job.status = ImportJobStatus.FAILED
+            job.error = str(error)
+        finally:
+            session.close()
+            os.remove(path)
+            job.finished_at = datetime.utcnow()
+
+    def shutdown(self):
+        """Wait for running imports"""
+        self.executor.shutdown(wait=True)
+        if self.process_pool:
+            self.process_pool.shutdown(wait=True)
+
+
+import_jobs = ImportJobManager(
+    workers=settings.import_workers,
+    max_pending=settings.import_max_pending,
+    keep=settings.import_jobs_keep,
+    processes=settings.import_processes,
+)
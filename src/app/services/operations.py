@@ -1,10 +1,227 @@
 """Business logic for operations"""
-from typing import Optional
-from fastapi import Depends
+import binascii
+import csv
+import heapq
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import Counter
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from io import StringIO
+from itertools import islice
+from typing import Optional, Union
+from fastapi import (
+    Depends,
+    HTTPException,
+    status,
+)
+from sqlalchemy import (
+    Date,
+    and_,
+    bindparam,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from ..settings import settings
 from ..database import get_session
-from ..tables import Operation as table_operation
-from ..models.operations import OperationKind, OperationCreate, OperationUpdate
+from ..tables import (
+    Operation as table_operation,
+    OperationDailyTotal as table_daily_total,
+    operations_fts,
+    OperationTombstone as table_tombstone,
+    User as table_user,
+)
+from ..models.operations import (
+    BatchItemResult,
+    BatchItemStatus,
+    Operation,
+    OperationBatch,
+    OperationBatchResult,
+    OperationBatchUpdate,
+    OperationFilter,
+    OperationKind,
+    OperationCreate,
+    OperationUpdate,
+    OperationSort,
+    OperationsPage,
+)
+from ..models.reports import SummaryPeriod
+from ..serialization import encode_rows
+from .archive import ArchiveService, matches
+from .base import AsyncService
+from .read_routing import get_api_read_session
+from .response_cache import data_versions
+from .rollup import RollupDeltas
+
+
+operation_fields = tuple(Operation.__fields__)
+sort_keys = {
+    OperationSort.DATE_DESC: ('date', True),
+    OperationSort.DATE_ASC: ('date', False),
+    OperationSort.AMOUNT_DESC: ('amount', True),
+    OperationSort.AMOUNT_ASC: ('amount', False),
+}
+cursor_types = {
+    'date': date.fromisoformat,
+    'amount': Decimal,
+}
+
+
+def pack_cursor(*values) -> str:
+    """Pack values of the last row of a page into an opaque cursor"""
+    raw = '|'.join(str(value) for value in values).encode()
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def unpack_cursor(cursor: str, *types) -> tuple:
+    """Unpack cursor made by pack_cursor, converting values with types"""
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        values = raw.split('|')
+        if len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (binascii.Error, UnicodeDecodeError, ValueError, InvalidOperation):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor',
+        ) from None
+
+
+def encode_cursor(operation: table_operation, key: str = 'date') -> str:
+    """Cursor of (sort key, id) of the last row of a list page"""
+    return pack_cursor(getattr(operation, key), operation.id)
+
+
+def decode_cursor(cursor: str, key: str = 'date') -> tuple:
+    """Unpack cursor made by encode_cursor"""
+    return unpack_cursor(cursor, cursor_types[key], int)
+
+
+def encode_change_cursor(change_seq: int, operation_id: int) -> str:
+    """Cursor of (change_seq, id) of a changes page"""
+    return pack_cursor(change_seq, operation_id)
+
+
+def decode_change_cursor(cursor: str) -> tuple[int, int]:
+    """Unpack cursor made by encode_change_cursor"""
+    return unpack_cursor(cursor, int, int)
+
+
+def after_cursor(cursor: str, key: str, descending: bool):
+    """WHERE condition of rows after cursor in (key, id) order
+
+    The plain bound on key lets PostgreSQL prune date partitions passed
+    already, the OR alone does not.
+    """
+    column = getattr(table_operation, key)
+    cursor_value, cursor_id = decode_cursor(cursor, key)
+    if descending:
+        return and_(
+            column <= cursor_value,
+            or_(
+                column < cursor_value,
+                and_(column == cursor_value, table_operation.id < cursor_id),
+            ),
+        )
+    return and_(
+        column >= cursor_value,
+        or_(
+            column > cursor_value,
+            and_(column == cursor_value, table_operation.id > cursor_id),
+        ),
+    )
+
+
+def description_condition(
+        value: str,
+        dialect_name: str,
+        prefix: bool = False,
+        indexed: bool = True):
+    """Case-insensitive substring or prefix match of description
+
+    PostgreSQL uses the trigram index, backslash being the default LIKE
+    escape there. FTS5 ignores LIKE with ESCAPE, so on SQLite the index is
+    searched with the raw value and the exact match checked on found rows.
+    """
+    def pattern(text: str) -> str:
+        return f'{text}%' if prefix else f'%{text}%'
+
+    escaped = pattern(value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+    if dialect_name == 'postgresql':
+        return table_operation.description.ilike(escaped)
+
+    exact = table_operation.description.like(escaped, escape='\\')
+    if dialect_name != 'sqlite' or not indexed:
+        return exact
+
+    return and_(
+        table_operation.id.in_(
+            select(operations_fts.c.rowid)
+            .where(operations_fts.c.description.like(pattern(value)))
+        ),
+        exact,
+    )
+
+
+def range_conditions(filters: OperationFilter) -> list:
+    """WHERE conditions of kind, date and amount filters"""
+    conditions = []
+    if filters.kind:
+        conditions.append(table_operation.kind == filters.kind)
+    if filters.date_from:
+        conditions.append(table_operation.date >= filters.date_from)
+    if filters.date_to:
+        conditions.append(table_operation.date <= filters.date_to)
+    if filters.amount_min is not None:
+        conditions.append(table_operation.amount >= filters.amount_min)
+    if filters.amount_max is not None:
+        conditions.append(table_operation.amount <= filters.amount_max)
+    return conditions
+
+
+def description_conditions(
+        filters: OperationFilter,
+        dialect_name: str,
+        indexed: bool = True) -> list:
+    """WHERE conditions of description filters"""
+    conditions = []
+    if filters.description_contains:
+        conditions.append(description_condition(
+            filters.description_contains, dialect_name, indexed=indexed,
+        ))
+    if filters.description_prefix:
+        conditions.append(description_condition(
+            filters.description_prefix, dialect_name, prefix=True, indexed=indexed,
+        ))
+    return conditions
+
+
+def filter_conditions(filters: OperationFilter, dialect_name: str) -> list:
+    """WHERE conditions of list filters"""
+    return range_conditions(filters) + description_conditions(filters, dialect_name)
+
+
+def period_start(column, period: SummaryPeriod, dialect_name: str):
+    """SQL expression of the first day of period containing column date"""
+    if period == SummaryPeriod.DAY:
+        return column
+    if dialect_name == 'postgresql':
+        return cast(func.date_trunc(period.value, column), Date)
+
+    modifiers = {
+        SummaryPeriod.WEEK: ('weekday 0', '-6 days'),
+        SummaryPeriod.MONTH: ('start of month',),
+    }
+    return func.date(column, *modifiers[period], type_=Date)
 
 
 class OperationService:
@@ -26,6 +243,77 @@ class OperationService:
         )
         return operations
 
+    @staticmethod
+    def select_many(user_id: int, fields: list[str]):
+        """statement of selected columns of all operations by user"""
+        columns = [getattr(table_operation, field) for field in fields]
+        return (
+            select(*columns)
+            .where(table_operation.user_id == user_id)
+            .order_by(
+                table_operation.date.desc(),
+                table_operation.id.desc(),
+            )
+        )
+
+    def iter_many(
+        self,
+        user_id: int,
+        fields: list[str],
+        batch_size: int) -> Result:
+        """stream selected columns of all operations by user"""
+        return self.session.execute(
+            self.select_many(user_id, fields),
+            execution_options={
+                'stream_results': True,
+                'max_row_buffer': batch_size,
+            },
+        )
+
+    def get_totals(
+        self,
+        user_id: int,
+        period: Optional[SummaryPeriod] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None) -> list[tuple]:
+        """sum income and outcome from daily totals, per period when given"""
+        def kind_sum(kind: OperationKind):
+            return func.coalesce(
+                func.sum(
+                    case(
+                        (table_daily_total.kind == kind.value, table_daily_total.amount),
+                        else_=0,
+                    )
+                ),
+                0,
+            )
+
+        columns = [
+            kind_sum(OperationKind.INCOME).label('income'),
+            kind_sum(OperationKind.OUTCOME).label('outcome'),
+        ]
+        if period:
+            bucket = period_start(
+                table_daily_total.date,
+                period,
+                self.session.get_bind().dialect.name,
+            )
+            columns.append(bucket.label('period_start'))
+
+        query = (
+            self.session
+            .query(*columns)
+            .filter(table_daily_total.user_id == user_id)
+        )
+        if date_from:
+            query = query.filter(table_daily_total.date >= date_from)
+        if date_to:
+            query = query.filter(table_daily_total.date <= date_to)
+        if period:
+            query = query.group_by(bucket).order_by(bucket)
+
+        return query.all()
+
     def _get(self, user_id: int, operation_id: int) -> table_operation:
         """get operation by id"""
         return (
@@ -38,73 +326,670 @@ class OperationService:
             .first()
         )
 
-    def get_list(
+    def _get_page(
         self,
+        entities: list,
         user_id: int,
-        kind: Optional[OperationKind] = None) -> list[table_operation]:
-        """get all operations"""
-        query = (
+        filters: Optional[OperationFilter] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None) -> tuple[list, Optional[str]]:
+        """rows of one filtered and sorted page of operations, and next cursor"""
+        filters = filters or OperationFilter()
+        limit = min(
+            limit or settings.operations_page_size,
+            settings.operations_max_page_size,
+        )
+        key, descending = sort_keys[filters.sort]
+        column = getattr(table_operation, key)
+        conditions = [table_operation.user_id == user_id, *range_conditions(filters)]
+        if cursor:
+            conditions.append(after_cursor(cursor, key, descending))
+        order_by = (
+            (column.desc(), table_operation.id.desc())
+            if descending else
+            (column.asc(), table_operation.id.asc())
+        )
+
+        operations = None
+        searched = filters.description_contains or filters.description_prefix
+        if searched and self.session.get_bind().dialect.name == 'sqlite':
+            operations = self._probe_page(entities, conditions, order_by, filters, limit)
+        if operations is None:
+            operations = (
+                self.session
+                .query(*entities)
+                .filter(
+                    *conditions,
+                    *description_conditions(filters, self.session.get_bind().dialect.name),
+                )
+                .order_by(*order_by)
+                .limit(limit + 1)
+                .all()
+            )
+
+        if filters.include_archived:
+            operations = self._add_archived(operations, user_id, filters, limit, cursor)
+
+        next_cursor = None
+        if len(operations) > limit:
+            operations = operations[:limit]
+            next_cursor = encode_cursor(operations[-1], key)
+
+        return operations, next_cursor
+
+    def _add_archived(
+        self,
+        operations: list,
+        user_id: int,
+        filters: OperationFilter,
+        limit: int,
+        cursor: Optional[str] = None) -> list:
+        """Hot rows of a page merged with the archived rows due on it
+
+        Chunks are picked by the manifest dates, a date cursor narrowing
+        them like a date filter; their rows are filtered here.
+        """
+        key, descending = sort_keys[filters.sort]
+        date_from, date_to = filters.date_from, filters.date_to
+        after = decode_cursor(cursor, key) if cursor else None
+        if after and key == 'date':
+            if descending:
+                date_to = min(date_to or after[0], after[0])
+            else:
+                date_from = max(date_from or after[0], after[0])
+
+        def order(row) -> tuple:
+            return getattr(row, key), row.id
+
+        archived = [
+            row
+            for row in ArchiveService(self.session).get_rows(
+                user_id,
+                date_from=date_from,
+                date_to=date_to,
+            )
+            if matches(row, filters) and (
+                not after
+                or (order(row) < after if descending else order(row) > after)
+            )
+        ]
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        archived = pick(limit + 1, archived, key=order)
+        merged = heapq.merge(operations, archived, key=order, reverse=descending)
+        return list(islice(merged, limit + 1))
+
+    def _probe_page(
+        self,
+        entities: list,
+        conditions: list,
+        order_by: tuple,
+        filters: OperationFilter,
+        limit: int) -> Optional[list]:
+        """page searched among the next rows in sort order, None if undecided
+
+        The trigram index reads every row holding the searched trigrams, a
+        common value is found sooner by a walk of the sort index. Only the
+        first description_scan_rows rows are walked, rare values are left
+        to the index.
+        """
+        scan_rows = settings.description_scan_rows
+        scanned = (
+            select(table_operation.id)
+            .where(*conditions)
+            .order_by(*order_by)
+            .limit(scan_rows)
+        )
+        operations = (
             self.session
-            .query(table_operation)
-            .filter_by(user_id=user_id)
+            .query(*entities)
+            .filter(
+                table_operation.id.in_(scanned),
+                *description_conditions(filters, 'sqlite', indexed=False),
+            )
+            .order_by(*order_by)
+            .limit(limit + 1)
+            .all()
         )
-        if kind:
-            query = query.filter_by(kind=kind)
+        if len(operations) > limit:
+            return operations
 
-        return query.all()
+        # all matching rows were among the scanned ones
+        scanned_count = self.session.scalar(
+            select(func.count()).select_from(scanned.subquery()),
+        )
+        return operations if scanned_count < scan_rows else None
+
+    def get_list(self, user_id: int, **kwargs) -> OperationsPage:
+        """get one page of operations, newest first unless sorted otherwise"""
+        operations, next_cursor = self._get_page([table_operation], user_id, **kwargs)
+        return OperationsPage(items=operations, next_cursor=next_cursor)
+
+    def get_list_raw(self, user_id: int, **kwargs) -> dict:
+        """get_list as plain dict of Operation fields, no orm objects or validation"""
+        columns = [getattr(table_operation, field) for field in operation_fields]
+        rows, next_cursor = self._get_page(columns, user_id, **kwargs)
+        return {
+            'items': encode_rows(operation_fields, rows, decimals=('amount',)),
+            'next_cursor': next_cursor,
+        }
+
+    def get_changes_raw(
+        self,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None) -> dict:
+        """operations written and deleted after cursor, oldest change first
+
+        Without cursor all operations are returned and no deletes. Reads
+        ix_operations_user_id_change_seq_id and the tombstones index, so
+        the cost follows the number of changes, not of operations.
+        """
+        limit = min(
+            limit or settings.operations_page_size,
+            settings.operations_max_page_size,
+        )
+        columns = [getattr(table_operation, field) for field in operation_fields]
+        upserts = (
+            select(table_operation.change_seq, *columns)
+            .where(table_operation.user_id == user_id)
+            .order_by(table_operation.change_seq, table_operation.id)
+            .limit(limit + 1)
+        )
+        deletes = None
+        if cursor:
+            change_seq, operation_id = decode_change_cursor(cursor)
+            upserts = upserts.where(
+                or_(
+                    table_operation.change_seq > change_seq,
+                    and_(
+                        table_operation.change_seq == change_seq,
+                        table_operation.id > operation_id,
+                    ),
+                )
+            )
+            deletes = (
+                select(table_tombstone.change_seq, table_tombstone.operation_id)
+                .where(
+                    table_tombstone.user_id == user_id,
+                    or_(
+                        table_tombstone.change_seq > change_seq,
+                        and_(
+                            table_tombstone.change_seq == change_seq,
+                            table_tombstone.operation_id > operation_id,
+                        ),
+                    ),
+                )
+                .order_by(table_tombstone.change_seq, table_tombstone.operation_id)
+                .limit(limit + 1)
+            )
+
+        changes = [
+            (row[0], row.id, row[1:])
+            for row in self.session.execute(upserts)
+        ]
+        if deletes is not None:
+            changes.extend(
+                (row.change_seq, row.operation_id, None)
+                for row in self.session.execute(deletes)
+            )
+        changes.sort(key=lambda change: change[:2])
+
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if changes:
+            cursor = encode_change_cursor(*changes[-1][:2])
+        return {
+            'upserts': encode_rows(
+                operation_fields,
+                (row for _, _, row in changes if row is not None),
+                decimals=('amount',),
+            ),
+            'deletes': [operation_id for _, operation_id, row in changes if row is None],
+            'next_cursor': cursor or encode_change_cursor(0, 0),
+            'has_more': has_more,
+        }
 
     def get(self, user_id: int, operation_id: int) -> table_operation:
         """get operation"""
         return self._get(user_id, operation_id)
 
+    def _reserve_changes(self, user_id: int, count: int) -> int:
+        """Take count change numbers of user, returns the first one
+
+        Runs before any operation row is written: the lock on the user row
+        makes writers of one user commit their change numbers in order.
+        """
+        table = table_user.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == user_id)
+            .values(change_seq=table.c.change_seq + count)
+        )
+        if self._has_returning():
+            last = self.session.execute(statement.returning(table.c.change_seq)).scalar_one()
+        else:
+            self.session.execute(statement)
+            last = self.session.execute(
+                select(table.c.change_seq).where(table.c.id == user_id)
+            ).scalar_one()
+        return last - count + 1
+
+    def _commit(self, user_id: int, deltas: RollupDeltas):
+        """Apply rollup deltas, commit, then move cached reads of user to a new version"""
+        deltas.apply(self.session)
+        self.session.commit()
+        data_versions.bump(user_id)
+
     def create_many(
         self,
         user_id: int,
         operations_data: list[OperationCreate]) -> list[table_operation]:
         """Creation operations report"""
+        first_change = self._reserve_changes(user_id, len(operations_data))
         operations = [
             table_operation(
                 **operation_data.dict(),
                 user_id=user_id,
+                change_seq=first_change + index,
             )
-            for operation_data in operations_data
+            for index, operation_data in enumerate(operations_data)
         ]
         self.session.add_all(operations)
-        self.session.commit()
+        deltas = RollupDeltas()
+        for operation in operations:
+            deltas.add_operation(operation)
+        self._commit(user_id, deltas)
 
         return operations
 
+    def _copy_rows(self, rows: list[dict]):
+        """Write rows with COPY FROM STDIN (PostgreSQL only)"""
+        columns = list(rows[0])
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row[column] for column in columns)
+        buffer.seek(0)
+
+        connection = self.session.connection().connection
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {table_operation.__tablename__} '
+                f'({", ".join(columns)}) FROM STDIN WITH CSV',
+                buffer,
+            )
+
+    def bulk_create(self, user_id: int, operations_data: list[dict]) -> int:
+        """Insert one chunk of operations without ORM objects"""
+        if not operations_data:
+            return 0
+
+        first_change = self._reserve_changes(user_id, len(operations_data))
+        rows = [
+            {**operation_data, 'user_id': user_id, 'change_seq': first_change + index}
+            for index, operation_data in enumerate(operations_data)
+        ]
+        if self.session.get_bind().dialect.name == 'postgresql':
+            self._copy_rows(rows)
+        else:
+            self.session.execute(insert(table_operation), rows)
+
+        deltas = RollupDeltas()
+        for row in rows:
+            deltas.add(user_id, row['date'], row['kind'], row['amount'])
+        self._commit(user_id, deltas)
+
+        return len(rows)
+
     def create(self, user_id: int, creation_data: OperationCreate) -> table_operation:
         """Creation operation"""
         operation = table_operation(
             **creation_data.dict(),
             user_id=user_id,
+            change_seq=self._reserve_changes(user_id, 1),
         )
         self.session.add(operation)
-        self.session.commit()
+        deltas = RollupDeltas()
+        deltas.add_operation(operation)
+        self._commit(user_id, deltas)
 
         return operation
 
+    def create_group(
+        self,
+        creations: list[tuple[int, OperationCreate]]) -> list[table_operation]:
+        """Create operations of many users in one transaction, in given order
+
+        Change numbers are reserved user by user in id order, so concurrent
+        group writers lock the user rows in the same order.
+        """
+        counts = Counter(user_id for user_id, _ in creations)
+        next_change = {
+            user_id: self._reserve_changes(user_id, counts[user_id])
+            for user_id in sorted(counts)
+        }
+        operations = []
+        for user_id, creation_data in creations:
+            operations.append(table_operation(
+                **creation_data.dict(),
+                user_id=user_id,
+                change_seq=next_change[user_id],
+            ))
+            next_change[user_id] += 1
+        self.session.add_all(operations)
+
+        deltas = RollupDeltas()
+        for operation in operations:
+            deltas.add_operation(operation)
+        deltas.apply(self.session)
+        self.session.commit()
+        for user_id in counts:
+            data_versions.bump(user_id)
+
+        return operations
+
+    def _has_returning(self) -> bool:
+        """UPDATE/DELETE ... RETURNING is supported"""
+        return self.session.get_bind().dialect.full_returning
+
+    def _select_old(self, user_id: int, operation_id: int):
+        """Rollup columns of operation before a write"""
+        return (
+            select(
+                table_operation.id,
+                table_operation.date,
+                table_operation.kind,
+                table_operation.amount,
+            )
+            .where(
+                table_operation.id == operation_id,
+                table_operation.user_id == user_id,
+            )
+        )
+
     def update(
         self,
         user_id: int,
         operation_id: int,
-        operation_data: OperationUpdate) -> table_operation:
-        """Edit operations"""
-        operation = self._get(user_id, operation_id)
-        if operation:
-            for field, value in operation_data:
-                setattr(operation, field, value)
-            self.session.commit()
+        operation_data: OperationUpdate) -> Optional[Operation]:
+        """Edit operation with one UPDATE ... RETURNING"""
+        values = operation_data.dict()
+        change_seq = self._reserve_changes(user_id, 1)
+        table = table_operation.__table__
+        if self._has_returning():
+            old = self._select_old(user_id, operation_id).with_for_update().subquery('old')
+            old_row = self.session.execute(
+                update(table)
+                .where(table.c.id == old.c.id)
+                .values(**values, change_seq=change_seq)
+                .returning(old.c.date, old.c.kind, old.c.amount)
+            ).first()
+        else:
+            old_row = self.session.execute(self._select_old(user_id, operation_id)).first()
+            if old_row:
+                self.session.execute(
+                    update(table)
+                    .where(table.c.id == operation_id)
+                    .values(**values, change_seq=change_seq)
+                )
 
-        return operation
+        if not old_row:
+            return None
 
-    def delete(self, user_id: int, operation_id: int):
+        deltas = RollupDeltas()
+        deltas.add(user_id, old_row.date, old_row.kind, old_row.amount, -1)
+        deltas.add(user_id, operation_data.date, operation_data.kind, operation_data.amount)
+        self._commit(user_id, deltas)
+
+        return Operation(id=operation_id, **values)
+
+    def _add_tombstones(self, user_id: int, operation_ids: list[int], first_change: int):
+        """Remember deleted operations for delta sync"""
+        self.session.execute(
+            insert(table_tombstone),
+            [
+                {
+                    'operation_id': operation_id,
+                    'change_seq': first_change + index,
+                    'user_id': user_id,
+                }
+                for index, operation_id in enumerate(operation_ids)
+            ],
+        )
+
+    def _batch_create(
+        self,
+        user_id: int,
+        operations_data: list[OperationCreate],
+        deltas: RollupDeltas) -> list[Operation]:
+        """Insert operations of batch"""
+        if not operations_data:
+            return []
+
+        first_change = self._reserve_changes(user_id, len(operations_data))
+        operations = [
+            table_operation(
+                **operation_data.dict(),
+                user_id=user_id,
+                change_seq=first_change + index,
+            )
+            for index, operation_data in enumerate(operations_data)
+        ]
+        self.session.add_all(operations)
+        self.session.flush()
+        for operation in operations:
+            deltas.add_operation(operation)
+
+        return [Operation.from_orm(operation) for operation in operations]
+
+    def _batch_update(
+        self,
+        user_id: int,
+        operations_data: list[OperationBatchUpdate],
+        current: dict,
+        deltas: RollupDeltas) -> list[BatchItemResult]:
+        """Update found operations of batch with one executemany"""
+        results = []
+        params = []
+        for operation_data in operations_data:
+            old = current.get(operation_data.id)
+            if not old:
+                results.append(BatchItemResult(
+                    id=operation_data.id,
+                    status=BatchItemStatus.NOT_FOUND,
+                ))
+                continue
+            deltas.add(user_id, old.date, old.kind, old.amount, -1)
+            deltas.add(
+                user_id,
+                operation_data.date,
+                operation_data.kind,
+                operation_data.amount,
+            )
+            current[operation_data.id] = operation_data
+            params.append({
+                'operation_id': operation_data.id,
+                'new_date': operation_data.date,
+                'new_kind': operation_data.kind,
+                'new_amount': operation_data.amount,
+                'new_description': operation_data.description,
+            })
+            results.append(BatchItemResult(id=operation_data.id, status=BatchItemStatus.OK))
+
+        if params:
+            first_change = self._reserve_changes(user_id, len(params))
+            for index, item in enumerate(params):
+                item['new_change_seq'] = first_change + index
+            self.session.execute(
+                update(table_operation.__table__)
+                .where(
+                    table_operation.id == bindparam('operation_id'),
+                    table_operation.user_id == user_id,
+                )
+                .values(
+                    date=bindparam('new_date'),
+                    kind=bindparam('new_kind'),
+                    amount=bindparam('new_amount'),
+                    description=bindparam('new_description'),
+                    change_seq=bindparam('new_change_seq'),
+                ),
+                params,
+            )
+
+        return results
+
+    def _batch_delete(
+        self,
+        user_id: int,
+        operation_ids: list[int],
+        current: dict,
+        deltas: RollupDeltas) -> list[BatchItemResult]:
+        """Delete found operations of batch with one statement"""
+        results = []
+        found_ids = []
+        for operation_id in operation_ids:
+            old = current.pop(operation_id, None)
+            if not old:
+                results.append(BatchItemResult(
+                    id=operation_id,
+                    status=BatchItemStatus.NOT_FOUND,
+                ))
+                continue
+            deltas.add(user_id, old.date, old.kind, old.amount, -1)
+            found_ids.append(operation_id)
+            results.append(BatchItemResult(id=operation_id, status=BatchItemStatus.OK))
+
+        if found_ids:
+            first_change = self._reserve_changes(user_id, len(found_ids))
+            self.session.execute(
+                delete(table_operation.__table__)
+                .where(
+                    table_operation.user_id == user_id,
+                    table_operation.id.in_(found_ids),
+                )
+            )
+            self._add_tombstones(user_id, found_ids, first_change)
+
+        return results
+
+    def apply_batch(self, user_id: int, batch: OperationBatch) -> OperationBatchResult:
+        """Create, then update, then delete operations in one transaction"""
+        deltas = RollupDeltas()
+        created = self._batch_create(user_id, batch.create, deltas)
+
+        requested_ids = {item.id for item in batch.update} | set(batch.delete)
+        current = {}
+        if requested_ids:
+            current = {
+                row.id: row
+                for row in (
+                    self.session
+                    .query(
+                        table_operation.id,
+                        table_operation.date,
+                        table_operation.kind,
+                        table_operation.amount,
+                    )
+                    .filter(
+                        table_operation.user_id == user_id,
+                        table_operation.id.in_(requested_ids),
+                    )
+                )
+            }
+
+        updated = self._batch_update(user_id, batch.update, current, deltas)
+        deleted = self._batch_delete(user_id, batch.delete, current, deltas)
+
+        self._commit(user_id, deltas)
+
+        return OperationBatchResult(
+            created=created,
+            updated=updated,
+            deleted=deleted,
+        )
+
+    def delete(self, user_id: int, operation_id: int) -> bool:
+        """Delete operation with one DELETE ... RETURNING, leave a tombstone"""
+        change_seq = self._reserve_changes(user_id, 1)
+        table = table_operation.__table__
+        statement = (
+            delete(table)
+            .where(
+                table.c.id == operation_id,
+                table.c.user_id == user_id,
+            )
+        )
+        if self._has_returning():
+            old_row = self.session.execute(
+                statement.returning(table.c.date, table.c.kind, table.c.amount)
+            ).first()
+        else:
+            old_row = self.session.execute(self._select_old(user_id, operation_id)).first()
+            if old_row:
+                self.session.execute(statement)
+
+        if not old_row:
+            return False
+
+        self._add_tombstones(user_id, [operation_id], change_seq)
+        deltas = RollupDeltas()
+        deltas.add(user_id, old_row.date, old_row.kind, old_row.amount, -1)
+        self._commit(user_id, deltas)
+
+        return True
+
+
+class AsyncOperationService(AsyncService):
+    """Operation Service for async views"""
+    async def _call(self, method: str, *args, **kwargs):
+        """Run OperationService method with the session"""
+        return await self.run(
+            lambda session: getattr(OperationService(session), method)(*args, **kwargs)
+        )
+
+    async def _call_one(self, method: str, *args, **kwargs) -> Optional[Operation]:
+        """Run OperationService method, load returned row before leaving the session"""
+        def call(session):
+            operation = getattr(OperationService(session), method)(*args, **kwargs)
+            return operation and Operation.from_orm(operation)
+        return await self.run(call)
+
+    async def get_list(self, *args, **kwargs) -> OperationsPage:
+        """get one page of operations, newest first"""
+        return await self._call('get_list', *args, **kwargs)
+
+    async def get_list_raw(self, *args, **kwargs) -> dict:
+        """get one page of operations as plain dict"""
+        return await self._call('get_list_raw', *args, **kwargs)
+
+    async def get_changes_raw(self, *args, **kwargs) -> dict:
+        """get operations changed after cursor as plain dict"""
+        return await self._call('get_changes_raw', *args, **kwargs)
+
+    async def get(self, *args, **kwargs) -> Optional[Operation]:
+        """get operation"""
+        return await self._call_one('get', *args, **kwargs)
+
+    async def create(self, *args, **kwargs) -> Operation:
+        """Creation operation"""
+        return await self._call_one('create', *args, **kwargs)
+
+    async def update(self, *args, **kwargs) -> Optional[Operation]:
+        """Edit operation"""
+        return await self._call('update', *args, **kwargs)
+
+    async def delete(self, *args, **kwargs) -> bool:
         """Delete operation"""
-        operation = self._get(user_id, operation_id)
-        if operation:
-            self.session.delete(operation)
-            self.session.commit()
-            operation = True
+        return await self._call('delete', *args, **kwargs)
 
-        return operation
+    async def apply_batch(self, *args, **kwargs) -> OperationBatchResult:
+        """Create, then update, then delete operations in one transaction"""
+        return await self._call('apply_batch', *args, **kwargs)
+
+
+class AsyncOperationReader(AsyncOperationService):
+    """Operation Service for read-only async views, on a read replica"""
+    def __init__(
+        self,
+        session: Union[Session, AsyncSession] = Depends(get_api_read_session)) -> None:
+        super().__init__(session)
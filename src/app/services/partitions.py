@@ -0,0 +1,148 @@
+"""Monthly partitions of operations on PostgreSQL"""
+import re
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+PARTITIONED_TABLE = 'operations'
+DEFAULT_PARTITION = 'operations_default'
+
+
+def month_start(day: date) -> date:
+    """First day of the month of day"""
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month months after month"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the partition of month"""
+    return f'{PARTITIONED_TABLE}_y{month.year}m{month.month:02}'
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Month of partition named by partition_name, None for other tables"""
+    match = re.fullmatch(rf'{PARTITIONED_TABLE}_y(\d{{4}})m(\d{{2}})', name)
+    return match and date(int(match[1]), int(match[2]), 1)
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """operations is a partitioned table"""
+    if connection.dialect.name != 'postgresql':
+        return False
+    return bool(connection.execute(
+        text(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = :table AND pg_table_is_visible(c.oid)'
+        ),
+        {'table': PARTITIONED_TABLE},
+    ).scalar())
+
+
+def existing_partitions(connection: Connection) -> set[str]:
+    """Names of partitions attached to operations"""
+    return set(connection.execute(
+        text(
+            'SELECT child.relname FROM pg_inherits i '
+            'JOIN pg_class child ON child.oid = i.inhrelid '
+            'JOIN pg_class parent ON parent.oid = i.inhparent '
+            'WHERE parent.relname = :table AND pg_table_is_visible(parent.oid)'
+        ),
+        {'table': PARTITIONED_TABLE},
+    ).scalars())
+
+
+def create_partition(connection: Connection, month: date):
+    """Create partition of month, rows of it in the default partition move there
+
+    The partition is filled while detached, attaching it only checks the
+    default partition holds no rows of the month any more.
+    """
+    name = partition_name(month)
+    bounds = {'start': month, 'end': add_months(month, 1)}
+    connection.execute(text(
+        f'CREATE TABLE {name} '
+        f'(LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    ))
+    connection.execute(
+        text(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            'WHERE date >= :start AND date < :end RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved'
+        ),
+        bounds,
+    )
+    # DDL takes no bound parameters, iso dates are safe to inline
+    connection.execute(text(
+        f'ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {name} '
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+
+
+def ensure_partitions(
+        connection: Connection,
+        months_ahead: int,
+        today: Optional[date] = None) -> list[str]:
+    """Create missing partitions up to months_ahead months after this one
+
+    Months with rows in the default partition get theirs too. Concurrent
+    runs wait for each other. Returns names of created partitions.
+    """
+    if not is_partitioned(connection):
+        return []
+
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('operations partitions'))"))
+
+    current = month_start(today or date.today())
+    months = {add_months(current, offset) for offset in range(months_ahead + 1)}
+    months.update(connection.execute(text(
+        f"SELECT DISTINCT date_trunc('month', date)::date FROM {DEFAULT_PARTITION}"
+    )).scalars())
+
+    existing = existing_partitions(connection)
+    created = []
+    for month in sorted(months):
+        if partition_name(month) not in existing:
+            create_partition(connection, month)
+            created.append(partition_name(month))
+    return created
+
+
+def drop_empty_partitions(connection: Connection, before: date) -> list[str]:
+    """Drop partitions of months before before that hold no rows any more
+
+    Archiving empties them, but deleted rows stay in their table and
+    indexes until vacuumed, a dropped partition is gone at once. Writers
+    are kept out while emptiness is checked again, readers are not. A row
+    of such a month written later goes to the default partition. Returns
+    names of dropped partitions.
+    """
+    if not is_partitioned(connection):
+        return []
+
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('operations partitions'))"))
+
+    candidates = []
+    for name in sorted(existing_partitions(connection)):
+        month = partition_month(name)
+        if month is None or add_months(month, 1) > before:
+            continue
+        if connection.execute(text(f'SELECT 1 FROM {name} LIMIT 1')).first() is None:
+            candidates.append(name)
+    if not candidates:
+        return []
+
+    connection.execute(text(f'LOCK TABLE {PARTITIONED_TABLE} IN SHARE ROW EXCLUSIVE MODE'))
+    dropped = []
+    for name in candidates:
+        if connection.execute(text(f'SELECT 1 FROM {name} LIMIT 1')).first() is None:
+            connection.execute(text(f'DROP TABLE {name}'))
+            dropped.append(name)
+    return dropped
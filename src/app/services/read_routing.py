@@ -0,0 +1,37 @@
+"""Sessions of read-only views on read replicas"""
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession as AsyncSessionType
+from sqlalchemy.orm import Session as SessionType
+
+from ..database import AsyncSession, Session, async_read_session, read_session
+from ..models.auth import User
+from ..settings import settings
+from .auth import get_current_user
+from .response_cache import data_versions
+
+
+def reads_primary(user: User) -> bool:
+    """User wrote recently, the replicas may not have the write yet
+
+    read_your_writes_seconds has to stay above the replication lag: a read
+    from a lagging replica would also be cached under the new data version.
+    """
+    return data_versions.written_within(user.id, settings.read_your_writes_seconds)
+
+
+def get_read_session(user: User = Depends(get_current_user)) -> SessionType:
+    """get session on a read replica, on the primary after a write of user"""
+    session = Session() if reads_primary(user) else read_session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+async def get_async_read_session(user: User = Depends(get_current_user)) -> AsyncSessionType:
+    """get async session on a read replica, on the primary after a write of user"""
+    async with (AsyncSession() if reads_primary(user) else async_read_session()) as session:
+        yield session
+
+
+get_api_read_session = get_async_read_session if settings.async_database else get_read_session
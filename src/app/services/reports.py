@@ -1,15 +1,90 @@
 """Business logic for reports"""
 import csv
+import os
+from collections import deque
+from concurrent.futures import Executor
+from datetime import date
 from io import StringIO
+from itertools import islice
+from operator import attrgetter
 from typing import (
+    AsyncIterator,
     BinaryIO,
-    TextIO,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Union,
 )
 
 from fastapi import Depends
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-from ..services.operations import OperationService
-from ..models.operations import OperationCreate, Operation
+from ..settings import settings
+from .archive import ArchivedRows, ArchiveService
+from .base import AsyncService
+from .operations import OperationService
+from .read_routing import get_api_read_session
+from ..models.operations import OperationCreate
+from ..models.reports import Balance, BalanceBucket, SummaryPeriod
+
+
+def flush_csv(output: StringIO) -> str:
+    """Take written csv chunk and reset buffer"""
+    chunk = output.getvalue()
+    output.seek(0)
+    output.truncate()
+    return chunk
+
+
+def split_ranges(path: str, size: int) -> list[tuple[int, int]]:
+    """Cut file into byte ranges of about size bytes ending on line breaks"""
+    ranges = []
+    total = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        start = 0
+        while start < total:
+            file.seek(min(start + size, total))
+            file.readline()
+            end = file.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_range(path: str, start: int, end: int) -> tuple[list[tuple], list[int], int]:
+    """Validate rows of one byte range
+
+    Runs in a worker process. Returns valid rows as tuples of report fields,
+    numbers of rejected lines counted from the range start and number of
+    lines in the range.
+    """
+    with open(path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start).decode()
+
+    reader = csv.DictReader(
+        StringIO(data, newline=''),
+        fieldnames=ReportsService.report_fields,
+    )
+    if start == 0:
+        next(reader, None)
+
+    rows = []
+    rejected = []
+    for row in reader:
+        try:
+            operation_data = ReportsService.parse_row(row)
+        except ValidationError:
+            rejected.append(reader.line_num)
+            continue
+        rows.append(tuple(
+            operation_data[field] for field in ReportsService.report_fields
+        ))
+
+    return rows, rejected, reader.line_num
 
 
 class ReportsService:
@@ -24,40 +99,213 @@ class ReportsService:
     def __init__(self, operations_service: OperationService = Depends()):
         self.operations_service = operations_service
 
-    def import_csv(self, user_id: int, file: BinaryIO):
-        """Uploud file operations"""
+    @staticmethod
+    def parse_row(row: dict) -> dict:
+        """Validate one csv row"""
+        operation_data = OperationCreate.parse_obj(row)
+        if operation_data.description == '':
+            operation_data.description = None
+        return operation_data.dict()
+
+    @staticmethod
+    def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+        """Split rows into lists of at most size items"""
+        rows = iter(rows)
+        while chunk := list(islice(rows, size)):
+            yield chunk
+
+    def import_csv(
+        self,
+        user_id: int,
+        file: BinaryIO,
+        progress: Optional[Callable[[int, list[int]], None]] = None) -> int:
+        """Uploud file operations chunk by chunk, skip invalid rows
+
+        progress gets number of imported rows so far and line numbers
+        rejected in the last chunk.
+        """
         reader = csv.DictReader(
             (line.decode() for line in file),
             fieldnames=self.report_fields,
         )
 
         next(reader, None)
-        operations_data = []
-        for row in reader:
-            operation_data = OperationCreate.parse_obj(row)
-            if operation_data.description == '':
-                operation_data.description = None
-            operations_data.append(operation_data)
-        self.operations_service.create_many(
+        rows = ((reader.line_num, row) for row in reader)
+        imported = 0
+        for chunk in self._chunks(rows, settings.import_batch_size):
+            operations_data = []
+            rejected = []
+            for line, row in chunk:
+                try:
+                    operations_data.append(self.parse_row(row))
+                except ValidationError:
+                    rejected.append(line)
+            imported += self.operations_service.bulk_create(
+                user_id,
+                operations_data,
+            )
+            if progress:
+                progress(imported, rejected)
+
+        return imported
+
+    def import_csv_parallel(
+        self,
+        user_id: int,
+        path: str,
+        executor: Executor,
+        window: int,
+        progress: Optional[Callable[[int, list[int]], None]] = None) -> int:
+        """Uploud file operations parsed in worker processes
+
+        The file is split into byte ranges on line breaks, so quoted values
+        must not span lines. At most window ranges are parsed ahead of the
+        writer, results are written in file order.
+        """
+        ranges = iter(split_ranges(path, settings.import_range_bytes))
+        pending = deque(
+            executor.submit(parse_range, path, *byte_range)
+            for byte_range in islice(ranges, window)
+        )
+
+        imported = lines = 0
+        while pending:
+            rows, rejected, range_lines = pending.popleft().result()
+            byte_range = next(ranges, None)
+            if byte_range:
+                pending.append(executor.submit(parse_range, path, *byte_range))
+
+            for chunk in self._chunks(rows, settings.import_batch_size):
+                imported += self.operations_service.bulk_create(
+                    user_id,
+                    [dict(zip(self.report_fields, row)) for row in chunk],
+                )
+            if progress:
+                progress(imported, [lines + line for line in rejected])
+            lines += range_lines
+
+        return imported
+
+    def export_csv(self, user_id: int) -> Iterator[str]:
+        """Download file operations chunk by chunk, archived ones merged in"""
+        batch_size = settings.export_batch_size
+        output = StringIO()
+        writer = csv.writer(output)
+        writer.writerow(self.report_fields)
+        report_row = attrgetter(*self.report_fields)
+
+        archived = ArchivedRows(
+            ArchiveService(self.operations_service.session).get_chunks(user_id)
+        )
+        rows = self.operations_service.iter_many(
             user_id,
-            operations_data,
+            ['id', *self.report_fields],
+            batch_size,
         )
+        for partition in rows.partitions(batch_size):
+            writer.writerows(map(report_row, archived.merge(partition)))
+            yield flush_csv(output)
 
-    def export_csv(self, user_id: int) -> TextIO:
-        """Download file operations"""
+        for partition in archived.rest(batch_size):
+            writer.writerows(map(report_row, partition))
+            yield flush_csv(output)
+
+        yield flush_csv(output)
+
+    def get_summary(
+        self,
+        user_id: int,
+        period: SummaryPeriod,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None) -> list[BalanceBucket]:
+        """Income, outcome and balance per period"""
+        rows = self.operations_service.get_totals(
+            user_id,
+            period,
+            date_from,
+            date_to,
+        )
+        return [
+            BalanceBucket(
+                period_start=row.period_start,
+                income=row.income,
+                outcome=row.outcome,
+                balance=row.income - row.outcome,
+            )
+            for row in rows
+        ]
+
+    def get_balance(
+        self,
+        user_id: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None) -> Balance:
+        """Income, outcome and balance of date range"""
+        row, = self.operations_service.get_totals(
+            user_id,
+            date_from=date_from,
+            date_to=date_to,
+        )
+        return Balance(
+            income=row.income,
+            outcome=row.outcome,
+            balance=row.income - row.outcome,
+        )
+
+
+class AsyncReportsService(AsyncService):
+    """Reports Service for async views"""
+    async def _export_csv_async(self, user_id: int) -> AsyncIterator[str]:
+        """Download file operations chunk by chunk from async session"""
+        batch_size = settings.export_batch_size
         output = StringIO()
-        writer = csv.DictWriter(
-            output,
-            fieldnames=self.report_fields,
-            extrasaction='ignore',
+        writer = csv.writer(output)
+        writer.writerow(ReportsService.report_fields)
+        report_row = attrgetter(*ReportsService.report_fields)
+
+        chunks = await self.session.execute(ArchiveService.select_chunks(user_id))
+        archived = ArchivedRows(chunks.all())
+        result = await self.session.stream(
+            OperationService.select_many(user_id, ['id', *ReportsService.report_fields])
+        )
+        async for rows in result.partitions(batch_size):
+            writer.writerows(map(report_row, archived.merge(rows)))
+            yield flush_csv(output)
+
+        for rows in archived.rest(batch_size):
+            writer.writerows(map(report_row, rows))
+            yield flush_csv(output)
+
+        yield flush_csv(output)
+
+    def export_csv(self, user_id: int) -> Union[Iterator[str], AsyncIterator[str]]:
+        """Download file operations chunk by chunk"""
+        if isinstance(self.session, AsyncSession):
+            return self._export_csv_async(user_id)
+        return ReportsService(OperationService(self.session)).export_csv(user_id)
+
+    async def get_summary(self, *args, **kwargs) -> list[BalanceBucket]:
+        """Income, outcome and balance per period"""
+        return await self.run(
+            lambda session: ReportsService(OperationService(session)).get_summary(
+                *args,
+                **kwargs,
+            )
         )
 
-        operations = self.operations_service.get_many(user_id)
+    async def get_balance(self, *args, **kwargs) -> Balance:
+        """Income, outcome and balance of date range"""
+        return await self.run(
+            lambda session: ReportsService(OperationService(session)).get_balance(
+                *args,
+                **kwargs,
+            )
+        )
 
-        writer.writeheader()
-        for operation in operations:
-            operation_data = Operation.from_orm(operation)
-            writer.writerow(operation_data.dict())
 
-        output.seek(0)
-        return output
+class AsyncReportsReader(AsyncReportsService):
+    """Reports Service for read-only async views, on a read replica"""
+    def __init__(
+        self,
+        session: Union[Session, AsyncSession] = Depends(get_api_read_session)) -> None:
+        super().__init__(session)
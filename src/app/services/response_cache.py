@@ -0,0 +1,188 @@
+"""Per-user data versions, ETags and cache of serialized reads"""
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import AsyncIterator, Optional
+
+from fastapi import Depends, Request, Response
+from fastapi.responses import StreamingResponse
+
+from ..models.auth import User
+from ..settings import settings
+from .auth import get_current_user
+
+
+class DataVersions:
+    """Counter per user, moved by every committed write of operations
+
+    Kept in process memory like the token cache: the app runs as one
+    process. The epoch changes on every start, so ETags given out before a
+    restart never match the versions counted after it.
+    """
+    def __init__(self) -> None:
+        self.epoch = uuid.uuid4().hex[:8]
+        self.versions: dict[int, int] = {}
+        self.written_at: dict[int, float] = {}
+        self.lock = Lock()
+
+    def get(self, user_id: int) -> int:
+        """Current version of user data"""
+        return self.versions.get(user_id, 0)
+
+    def bump(self, user_id: int):
+        """User data changed"""
+        with self.lock:
+            self.versions[user_id] = self.versions.get(user_id, 0) + 1
+            self.written_at[user_id] = time.monotonic()
+
+    def written_within(self, user_id: int, seconds: float) -> bool:
+        """User data changed less than seconds ago"""
+        written_at = self.written_at.get(user_id)
+        return written_at is not None and time.monotonic() - written_at < seconds
+
+
+class CachedResponse:# pylint: disable=too-few-public-methods
+    """Body and headers of a stored response"""
+    __slots__ = ('body', 'headers')
+
+    def __init__(self, body: bytes, headers: dict[str, str]) -> None:
+        self.body = body
+        self.headers = headers
+
+
+class ResponseCache:
+    """LRU of serialized responses limited by total body size"""
+    def __init__(self, max_bytes: int, max_entry_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self.size = 0
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        """Stored response of key"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: tuple, body: bytes, headers: dict[str, str]):
+        """Store response, evict least recently used ones above max_bytes"""
+        if len(body) > self.max_entry_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+            self.entries[key] = CachedResponse(body, headers)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+
+    def stats(self) -> dict:
+        """Counters for diagnostics"""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of If-None-Match with etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(
+        candidate.strip().removeprefix('W/') == etag
+        for candidate in if_none_match.split(',')
+    )
+
+
+class ConditionalRead:
+    """ETag and cached response of one read of user data
+
+    The version is taken before the query runs, so a write committed
+    meanwhile leaves the stored response under the old version.
+    """
+    def __init__(self, request: Request, user: User = Depends(get_current_user)):
+        self.user = user
+        self.version = data_versions.get(user.id)
+        variant = f'{request.url.path}?{sorted(request.query_params.multi_items())}'
+        self.key = (user.id, self.version, variant)
+        digest = hashlib.blake2b(repr(self.key).encode(), digest_size=8).hexdigest()
+        self.etag = f'"{data_versions.epoch}-{digest}"'
+        self.if_none_match = request.headers.get('if-none-match')
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """Validators of the response, clients must revalidate"""
+        return {'ETag': self.etag, 'Cache-Control': 'private, no-cache'}
+
+    def cached(self) -> Optional[Response]:
+        """304 when client has this version, stored response when there is one"""
+        if etag_matches(self.if_none_match, self.etag):
+            return Response(status_code=304, headers=self.headers)
+
+        entry = response_cache.get(self.key)
+        if entry is None:
+            return None
+        return Response(entry.body, headers={**entry.headers, **self.headers})
+
+    @staticmethod
+    def _stored_headers(response: Response) -> dict[str, str]:
+        return {
+            name: value
+            for name, value in response.headers.items()
+            if name not in ('content-length', 'etag', 'cache-control')
+        }
+
+    def respond(self, response: Response) -> Response:
+        """Store rendered response and add validators"""
+        response.headers.update(self.headers)
+        response_cache.set(self.key, response.body, self._stored_headers(response))
+        return response
+
+    def stream(self, response: StreamingResponse) -> StreamingResponse:
+        """Add validators, store the body once it was streamed completely"""
+        response.headers.update(self.headers)
+        response.body_iterator = self._tee(
+            response.body_iterator,
+            self._stored_headers(response),
+            response.charset,
+        )
+        return response
+
+    async def _tee(self, chunks: AsyncIterator, headers: dict[str, str], charset: str):
+        body: Optional[list[bytes]] = []
+        size = 0
+        async for chunk in chunks:
+            if body is not None:
+                chunk_bytes = chunk if isinstance(chunk, bytes) else chunk.encode(charset)
+                size += len(chunk_bytes)
+                body.append(chunk_bytes)
+                if size > response_cache.max_entry_bytes:
+                    body = None
+            yield chunk
+
+        if body is not None:
+            response_cache.set(self.key, b''.join(body), headers)
+
+
+data_versions = DataVersions()
+response_cache = ResponseCache(
+    settings.response_cache_bytes,
+    settings.response_cache_entry_bytes,
+)
@@ -0,0 +1,130 @@
+"""Daily totals kept in step with operations"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import (
+    delete,
+    func,
+    insert,
+    select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..tables import (
+    Operation as table_operation,
+    OperationArchive as table_archive,
+    OperationDailyTotal as table_daily_total,
+)
+from ..models.operations import OperationKind
+from .archive import decode_chunk
+
+
+class RollupDeltas:
+    """Changes of daily totals made by one transaction"""
+    def __init__(self) -> None:
+        self.totals: defaultdict[tuple, list] = defaultdict(lambda: [Decimal(0), 0])
+        self.removed = False
+
+    def add(
+        self,
+        user_id: int,
+        operation_date: date,
+        kind: str,
+        amount: Decimal,
+        sign: int = 1):
+        """Count operation in (sign=1) or out (sign=-1) of its day"""
+        total = self.totals[(user_id, operation_date, OperationKind(kind).value)]
+        total[0] += amount * sign
+        total[1] += sign
+        if sign < 0:
+            self.removed = True
+
+    def add_operation(self, operation: table_operation, sign: int = 1):
+        """Count ORM operation"""
+        self.add(
+            operation.user_id,
+            operation.date,
+            operation.kind,
+            operation.amount,
+            sign,
+        )
+
+    def apply(self, session: Session):
+        """Upsert totals in session transaction, drop emptied days"""
+        rows = [
+            {
+                'user_id': user_id,
+                'date': operation_date,
+                'kind': kind,
+                'amount': amount,
+                'count': count,
+            }
+            for (user_id, operation_date, kind), (amount, count)
+            in self.totals.items()
+            if amount or count
+        ]
+        if rows:
+            dialect = postgresql
+            if session.get_bind().dialect.name != 'postgresql':
+                dialect = sqlite
+            statement = dialect.insert(table_daily_total)
+            statement = statement.on_conflict_do_update(
+                index_elements=['user_id', 'date', 'kind'],
+                set_={
+                    'amount': table_daily_total.amount + statement.excluded.amount,
+                    'count': table_daily_total.count + statement.excluded.count,
+                },
+            )
+            session.execute(statement, rows)
+
+        if self.removed:
+            user_ids = {user_id for user_id, _, _ in self.totals}
+            session.execute(
+                delete(table_daily_total)
+                .where(table_daily_total.user_id.in_(user_ids))
+                .where(table_daily_total.count <= 0)
+            )
+
+        self.totals.clear()
+        self.removed = False
+
+
+def rebuild_rollup(session: Session, user_id: Optional[int] = None):
+    """Recount daily totals from operations, archived ones included"""
+    cleanup = delete(table_daily_total)
+    totals = (
+        select(
+            table_operation.user_id,
+            table_operation.date,
+            table_operation.kind,
+            func.sum(table_operation.amount),
+            func.count(),
+        )
+        .group_by(
+            table_operation.user_id,
+            table_operation.date,
+            table_operation.kind,
+        )
+    )
+    chunks = select(table_archive.user_id, table_archive.data)
+    if user_id is not None:
+        cleanup = cleanup.where(table_daily_total.user_id == user_id)
+        totals = totals.where(table_operation.user_id == user_id)
+        chunks = chunks.where(table_archive.user_id == user_id)
+
+    session.execute(cleanup)
+    session.execute(
+        insert(table_daily_total).from_select(
+            ['user_id', 'date', 'kind', 'amount', 'count'],
+            totals,
+        )
+    )
+    deltas = RollupDeltas()
+    for chunk in session.execute(chunks):
+        for row in decode_chunk(chunk.data):
+            deltas.add(chunk.user_id, row.date, row.kind, row.amount)
+    deltas.apply(session)
+    session.commit()
@@ -0,0 +1,54 @@
+"""Cache of verified tokens"""
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from ..settings import settings
+from ..models.auth import User
+
+
+class TokenCache:
+    """LRU of token -> user, every entry lives until token expiration"""
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.entries: OrderedDict[str, tuple[User, float]] = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[User]:
+        """Get user of a still valid token"""
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry and entry[1] > time.time():
+                self.entries.move_to_end(token)
+                self.hits += 1
+                return entry[0]
+
+            if entry:
+                del self.entries[token]
+            self.misses += 1
+            return None
+
+    def set(self, token: str, user: User, expires: float):
+        """Remember verified token"""
+        if not self.size:
+            return
+        with self.lock:
+            self.entries[token] = (user, expires)
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Counters for diagnostics"""
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+token_cache = TokenCache(settings.token_cache_size)
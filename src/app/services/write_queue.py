@@ -0,0 +1,185 @@
+"""Group commit of single operation creates"""
+import asyncio
+import logging
+import queue
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Optional
+
+from fastapi import (
+    HTTPException,
+    status,
+)
+
+from ..database import Session
+from ..metrics import Histogram, PrometheusText
+from ..models.operations import Operation, OperationCreate
+from ..settings import settings
+from .operations import OperationService
+
+
+GROUP_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitQueue:# pylint: disable=too-many-instance-attributes
+    """Creates of concurrent requests written by one thread, many per commit
+
+    The writer takes what queued up during the previous commit, waits at
+    most wait_ms for more while below max_rows, then inserts all of them
+    in one transaction. Every request is answered after that commit, so
+    an answered create is as durable as with its own commit. When a group
+    fails its creates are retried one by one, only the bad one fails.
+    The writer thread uses the sync engine in both database modes.
+    """
+    def __init__(self, max_rows: int, wait_ms: float, queue_size: int) -> None:
+        self.max_rows = max_rows
+        self.wait = wait_ms / 1000
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.thread: Optional[Thread] = None
+        self.lock = Lock()
+        self.stopping = False
+        self.group_rows = Histogram(GROUP_BUCKETS)
+        self.retried_groups = 0
+
+    def _start(self):
+        """Start writer thread on first use"""
+        with self.lock:
+            if not self.thread:
+                self.thread = Thread(target=self._run, name='group-commit', daemon=True)
+                self.thread.start()
+
+    def submit(self, user_id: int, creation_data: OperationCreate) -> Future:
+        """Queue create, the future gets the new Operation once committed"""
+        self._start()
+        future: Future = Future()
+        try:
+            self.queue.put_nowait((user_id, creation_data, future))
+        except queue.Full:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Too many pending writes',
+                headers={'Retry-After': '1'},
+            ) from None
+        return future
+
+    async def create(self, user_id: int, creation_data: OperationCreate) -> Operation:
+        """Queue create and await the committed operation"""
+        return await asyncio.wrap_future(self.submit(user_id, creation_data))
+
+    def _take(self) -> Optional[list]:
+        """Next group of creates, None once stopped"""
+        item = None if self.stopping else self.queue.get()
+        if item is None:
+            return None
+
+        group = [item]
+        deadline = time.monotonic() + self.wait
+        while len(group) < self.max_rows:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if item is None:
+                # stop after this group
+                self.stopping = True
+                break
+            group.append(item)
+        return group
+
+    def _run(self):
+        """Write groups until stopped"""
+        while True:
+            group = self._take()
+            if group is None:
+                return
+            self.group_rows.observe(len(group))
+            try:
+                self._write(group)
+            except Exception as error:# pylint: disable=broad-except
+                logger.exception('group commit failed')
+                for _, _, future in group:
+                    self._resolve(future, error=error)
+
+    @staticmethod
+    def _resolve(future: Future, result=None, error: Optional[BaseException] = None):
+        """Answer request unless it was answered or went away"""
+        if future.done() or not future.set_running_or_notify_cancel():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _write(self, group: list):
+        """Insert group in one transaction, one by one if that fails"""
+        with Session(expire_on_commit=False) as session:
+            service = OperationService(session)
+            try:
+                operations = service.create_group(
+                    [(user_id, creation_data) for user_id, creation_data, _ in group]
+                )
+            except Exception:# pylint: disable=broad-except
+                session.rollback()
+                if len(group) == 1:
+                    raise
+            else:
+                for (_, _, future), operation in zip(group, operations):
+                    self._resolve(future, Operation.from_orm(operation))
+                return
+
+            with self.lock:
+                self.retried_groups += 1
+            for user_id, creation_data, future in group:
+                try:
+                    operation = service.create_group([(user_id, creation_data)])[0]
+                except Exception as error:# pylint: disable=broad-except
+                    session.rollback()
+                    self._resolve(future, error=error)
+                else:
+                    self._resolve(future, Operation.from_orm(operation))
+
+    def collect(self, text: PrometheusText):
+        """Add group commit metrics"""
+        with self.lock:
+            retried_groups = self.retried_groups
+
+        text.scalar(
+            'group_commit_pending', 'gauge', 'Creates waiting for the writer',
+            [({}, self.queue.qsize())],
+        )
+        text.histogram(
+            'group_commit_rows', 'Creates written per commit',
+            [({}, self.group_rows.snapshot())],
+        )
+        text.scalar(
+            'group_commit_retried_groups_total', 'counter',
+            'Failed groups written again one by one',
+            [({}, retried_groups)],
+        )
+
+    def shutdown(self):
+        """Write queued creates, then stop the writer"""
+        with self.lock:
+            thread = self.thread
+        if thread:
+            self.queue.put(None)
+            thread.join()
+            with self.lock:
+                self.thread = None
+                self.stopping = False
+
+
+write_queue = GroupCommitQueue(
+    max_rows=settings.group_commit_max_rows,
+    wait_ms=settings.group_commit_wait_ms,
+    queue_size=settings.group_commit_queue_size,
+)
@@ -1,5 +1,6 @@
 """All settings"""
 import os
+from typing import Optional
 from dotenv import find_dotenv, load_dotenv
 from pydantic import BaseSettings
 
@@ -13,10 +14,57 @@ class Settings(BaseSettings):# pylint: disable=too-few-public-methods
     server_port: int = 8000
 
     database_url = os.getenv("DATABASE_URL")
+    async_database: bool = False
+    async_database_url: Optional[str] = None
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    # comma separated urls of read replicas, reads are spread over them
+    read_database_url: Optional[str] = None
+    read_your_writes_seconds: float = 5
+    partition_months_ahead: int = 3
+    # operations dated before this many months ago go to the archive
+    archive_after_months: int = 12
+
+    metrics_enabled: bool = True
+    slow_query_ms: float = 500
 
     jwt_secret: str
     jwt_algorithm: str = 'HS256'
     jwt_expiration: int = 1 * 60 * 60
+    token_cache_size: int = 10000
+
+    response_cache_bytes: int = 64 * 1024 * 1024
+    response_cache_entry_bytes: int = 4 * 1024 * 1024
+    analytics_cache_bytes: int = 64 * 1024 * 1024
+    analytics_batch_size: int = 10000
+
+    bcrypt_rounds: int = 12
+    hashing_workers: int = 2
+    hashing_queue_size: int = 16
+
+    operations_page_size: int = 100
+    operations_max_page_size: int = 1000
+    operations_max_batch_size: int = 1000
+    description_scan_rows: int = 1000
+
+    group_commit: bool = False
+    group_commit_max_rows: int = 500
+    group_commit_wait_ms: float = 2
+    group_commit_queue_size: int = 10000
+
+    export_batch_size: int = 1000
+    import_batch_size: int = 5000
+    import_workers: int = 2
+    import_max_pending: int = 8
+    import_jobs_keep: int = 100
+    import_spool_dir: Optional[str] = None
+    import_rejected_lines_keep: int = 100
+    import_processes: int = 0
+    import_parallel_min_bytes: int = 16 * 1024 * 1024
+    import_range_bytes: int = 4 * 1024 * 1024
 
     class Config:# pylint: disable=too-few-public-methods
         """orm_mode on"""
@@ -1,12 +1,21 @@
 """Tables description"""
 from sqlalchemy import (
+    DDL,
+    BigInteger,
     Column,
     Date,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     Numeric,
+    PrimaryKeyConstraint,
     String,
+    column,
+    event,
+    table,
 )
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -22,6 +31,8 @@ class User(Base):# pylint: disable=too-few-public-methods
     email = Column(String, unique=True)
     username = Column(String, unique=True)
     password_hash = Column(String)
+    # last change number given to operations of the user
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default='0')
 
 
 class Operation(Base):# pylint: disable=too-few-public-methods
@@ -29,10 +40,152 @@ class Operation(Base):# pylint: disable=too-few-public-methods
     __tablename__ = 'operations'
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), index=True)
+    user_id = Column(Integer, ForeignKey('users.id'))
     date = Column(Date)
     kind = Column(String)
     amount = Column(Numeric(10, 2))
     description = Column(String, nullable=True)
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default='0')
 
     user = relationship('User', backref='operations')
+
+    __table_args__ = (
+        Index(
+            'ix_operations_user_id_date_id',
+            user_id,
+            date.desc(),
+            id.desc(),
+        ),
+        Index(
+            'ix_operations_user_id_kind_date_id',
+            user_id,
+            kind,
+            date.desc(),
+            id.desc(),
+        ),
+        Index(
+            'ix_operations_user_id_amount_id',
+            user_id,
+            amount,
+            id,
+        ),
+        Index(
+            'ix_operations_user_id_change_seq_id',
+            user_id,
+            change_seq,
+            id,
+        ),
+        # monthly partitions on PostgreSQL, made by app.create_partitions
+        {'postgresql_partition_by': 'RANGE (date)'},
+    )
+
+
+@compiles(PrimaryKeyConstraint, 'postgresql')
+def compile_primary_key(constraint, compiler, **kw) -> str:
+    """Primary key of partitioned operations has to hold the partition key"""
+    if constraint.table is not Operation.__table__:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    return 'PRIMARY KEY (id, date)'
+
+
+# description search index, kept in step with operations by triggers
+SQLITE_DESCRIPTION_INDEX = (
+    "CREATE VIRTUAL TABLE operations_fts USING fts5("
+    "description, content='operations', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER operations_fts_insert AFTER INSERT ON operations BEGIN "
+    "INSERT INTO operations_fts (rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER operations_fts_delete AFTER DELETE ON operations BEGIN "
+    "INSERT INTO operations_fts (operations_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER operations_fts_update AFTER UPDATE OF description ON operations BEGIN "
+    "INSERT INTO operations_fts (operations_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO operations_fts (rowid, description) VALUES (new.id, new.description); END",
+)
+POSTGRESQL_DESCRIPTION_INDEX = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE EXTENSION IF NOT EXISTS btree_gin',
+    'CREATE INDEX ix_operations_user_id_description_trgm ON operations '
+    'USING gin (user_id, description gin_trgm_ops)',
+)
+for dialect, statements in (
+        ('sqlite', SQLITE_DESCRIPTION_INDEX),
+        ('postgresql', POSTGRESQL_DESCRIPTION_INDEX)):
+    for statement in statements:
+        event.listen(
+            Operation.__table__,
+            'after_create',
+            DDL(statement).execute_if(dialect=dialect),
+        )
+event.listen(
+    Operation.__table__,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS operations_fts').execute_if(dialect='sqlite'),
+)
+# rows of months without partition, moved out when their partition is made
+event.listen(
+    Operation.__table__,
+    'after_create',
+    DDL('CREATE TABLE operations_default PARTITION OF operations DEFAULT')
+    .execute_if(dialect='postgresql'),
+)
+
+operations_fts = table(
+    'operations_fts',
+    column('rowid', Integer),
+    column('description', String),
+)
+
+
+class OperationDailyTotal(Base):# pylint: disable=too-few-public-methods
+    """Sum and count of user operations per day and kind"""
+    __tablename__ = 'operation_daily_totals'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    date = Column(Date, primary_key=True)
+    kind = Column(String, primary_key=True)
+    amount = Column(Numeric(14, 2), nullable=False)
+    count = Column(Integer, nullable=False)
+
+
+class OperationTombstone(Base):# pylint: disable=too-few-public-methods
+    """Deleted operation, kept for delta sync"""
+    __tablename__ = 'operation_tombstones'
+
+    operation_id = Column(Integer, primary_key=True)
+    change_seq = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+
+    __table_args__ = (
+        Index(
+            'ix_operation_tombstones_user_id_change_seq_operation_id',
+            user_id,
+            change_seq,
+            operation_id,
+        ),
+    )
+
+
+class OperationArchive(Base):# pylint: disable=too-few-public-methods
+    """Compressed operations of a user moved out of operations, one month per row
+
+    Every column but data is the manifest, data holds the rows column by
+    column. A month archived again later gets another row.
+    """
+    __tablename__ = 'operation_archives'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    # first and last date of the archived rows
+    date_from = Column(Date, nullable=False)
+    date_to = Column(Date, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index(
+            'ix_operation_archives_user_id_date_from',
+            user_id,
+            date_from,
+        ),
+    )